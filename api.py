@@ -0,0 +1,394 @@
+"""
+Read-only JSON API of the effective tax rates.
+
+GET /api/v1/rates returns one record per jurisdiction and rate column, with
+the rate column split into its measure (statutory, metr, aetr), asset class
+(overall, machines, buildings, ip, inventory, land) and financing type
+(overall, equity, debt, debt_bias), and the jurisdiction's rank in the
+figures. Query parameters, each a comma separated list:
+
+    country    country codes, e.g. USA,DEU,OECD
+    measure    statutory, metr or aetr
+    asset      asset classes
+    financing  financing types
+    scenario   one alternative policy (CL, BONUS, ...) in the data; CL by
+               default
+    vintage    one data vintage; the default vintage otherwise
+    fields     fields of each record to return, all by default
+    offset     records to skip, 0 by default
+    limit      records to return, API_PAGE_SIZE by default and at most
+               API_MAX_PAGE_SIZE
+
+GET /api/v1/ lists the values each filter accepts.
+
+GET /api/v1/rank places a rate among the OECD members other than the US,
+from the highest: its rank, 1 for the highest, the members above it and its
+gap to the weighted OECD average. Query parameters:
+
+    column     rate column, e.g. metr_overall
+    value      rate to place, e.g. 0.25; or else
+    country    US entry to place, USA, USA_H or USA_B
+    scenario   one alternative policy for the US entry; CL by default
+    vintage    one data vintage; the default vintage otherwise
+
+GET /api/v1/break-even returns the highest US statutory rate, other policy
+at current law, at which the US would rank at a given rank or lower on a
+rate column, with the column and rank query parameters. Its status is
+"found" when there is one, and otherwise the rate is null and the status
+tells why: "every_rate" when every rate from 0 to 60 percent does, as at
+rank 1, "no_rate" when none does, and "not_increasing" when the column
+does not rise with the statutory rate.
+
+Records are filtered from a columnar table built once per dataset and
+scenario from the data store and its precomputed rankings. Responses carry
+an ETag of the data version and the query, and conditional requests are
+answered with 304 Not Modified before any records are read.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import weakref
+
+import flask
+import numpy as np
+from werkzeug.exceptions import HTTPException
+
+import datasource
+from scenarios import SCENARIOS, US_ENTRIES
+from util import json_error, split
+
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 100))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 1000))
+
+FIELDS = [
+    "country",
+    "name",
+    "column",
+    "measure",
+    "asset",
+    "financing",
+    "scenario",
+    "value",
+    "rank",
+]
+
+FILTERS = ["country", "measure", "asset", "financing"]
+
+blueprint = flask.Blueprint("api", __name__)
+blueprint.register_error_handler(HTTPException, json_error)
+
+
+def describe(column):
+    """
+    Measure, asset class and financing type of a rate column.
+    """
+    if column == "statutory_tax_rate":
+        return "statutory", "overall", "overall"
+    measure, rest = column.split("_", 1)
+    if rest == "overall":
+        return measure, "overall", "overall"
+    if rest.endswith("_overall"):
+        return measure, "overall", rest[: -len("_overall")]
+    if rest == "debt_bias":
+        return measure, "overall", "debt_bias"
+    return measure, rest, "overall"
+
+
+class RateTable:
+    """
+    Rates of every jurisdiction and rate column of a dataset under one
+    scenario, as one array per field, ordered by jurisdiction.
+
+    Under current law the table holds the comparable jurisdictions, the
+    OECD average included; under an alternative policy, the ranked ones.
+    Rank is the 1-based position in the figures, 0 when not ranked.
+    """
+
+    def __init__(self, dataset, scenario):
+        store = dataset.store
+        part = "comparable" if scenario == "CL" else "ranked"
+        rows = np.arange(len(store))[store.partitions[part]]
+        ranked = np.arange(len(store))[store.partitions["ranked"]]
+        # Position of each row within the ranked partition, or -1
+        position = np.searchsorted(ranked, rows)
+        position[position == len(ranked)] = 0
+        position = np.where(ranked[position] == rows, position, -1)
+
+        table = dataset.ranks.scenario_table
+        values, ranks = [], []
+        for measure in store.measures:
+            if scenario == "CL":
+                values.append(store.column(measure, part))
+            else:
+                values.append(
+                    table.values[SCENARIOS.index(scenario), :, table.column[measure]]
+                )
+            order = dataset.ranks.get(measure, None if scenario == "CL" else scenario)
+            rank = np.empty(len(ranked), dtype=np.int64)
+            rank[order.order] = np.arange(1, len(ranked) + 1)
+            ranks.append(np.where(position >= 0, rank[position], 0))
+
+        labels = [describe(measure) for measure in store.measures]
+        count = len(store.measures)
+        self.fields = {
+            "country": np.repeat(store.column("country", part), count),
+            "name": np.repeat(store.column("name", part), count),
+            "column": np.tile(np.array(store.measures), len(rows)),
+            "measure": np.tile(np.array([m for m, _, _ in labels]), len(rows)),
+            "asset": np.tile(np.array([a for _, a, _ in labels]), len(rows)),
+            "financing": np.tile(np.array([f for _, _, f in labels]), len(rows)),
+            "value": np.column_stack(values).ravel(),
+            "rank": np.column_stack(ranks).ravel(),
+        }
+        self.scenario = scenario
+
+    def __len__(self):
+        return len(self.fields["value"])
+
+    def select(self, filters):
+        """
+        Indexes of the records matching every filter, a list of values per field.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for field, values in filters.items():
+            mask &= np.isin(self.fields[field], values)
+        return np.flatnonzero(mask)
+
+    def records(self, indexes, fields):
+        """
+        Records at the given indexes, with the given fields.
+        """
+        columns = {}
+        for field in fields:
+            if field == "scenario":
+                columns[field] = [self.scenario] * len(indexes)
+            else:
+                columns[field] = self.fields[field][indexes].tolist()
+        return [
+            {
+                field: None if isinstance(v, float) and math.isnan(v) else v
+                for field, v in zip(fields, row)
+            }
+            for row in zip(*columns.values())
+        ]
+
+
+_tables = weakref.WeakKeyDictionary()
+_tables_lock = threading.Lock()
+
+
+def rate_table(dataset, scenario):
+    """
+    Rate table of a dataset under a scenario, built on first use.
+    """
+    with _tables_lock:
+        tables = _tables.setdefault(dataset, {})
+        if scenario not in tables:
+            tables[scenario] = RateTable(dataset, scenario)
+        return tables[scenario]
+
+
+def integer(name, default, maximum=None):
+    """
+    Non-negative integer query parameter.
+    """
+    value = flask.request.args.get(name, default)
+    try:
+        value = int(value)
+    except ValueError:
+        flask.abort(400, "{} must be an integer".format(name))
+    if value < 0:
+        flask.abort(400, "{} must not be negative".format(name))
+    return value if maximum is None else min(value, maximum)
+
+
+def number(name):
+    """
+    Finite float query parameter.
+    """
+    try:
+        value = float(flask.request.args[name])
+    except ValueError:
+        flask.abort(400, "{} must be a number".format(name))
+    if not math.isfinite(value):
+        flask.abort(400, "{} must be finite".format(name))
+    return value
+
+
+def rank_column(dataset):
+    column = flask.request.args.get("column")
+    if column not in dataset.solver.values:
+        flask.abort(400, "Unknown column: {}".format(column))
+    return column
+
+
+def json_response(body):
+    return flask.Response(json.dumps(body), mimetype="application/json")
+
+
+def conditional(body):
+    """
+    Response with an ETag of the data version and the query, 304 if the
+    client already has it. body is only called when it does not.
+    """
+    args = sorted(flask.request.args.items(multi=True))
+    dataset = datasource.get(flask.request.args.get("vintage") or None)
+    tag = hashlib.sha256(
+        json.dumps([dataset.version, flask.request.path, args]).encode()
+    ).hexdigest()[:32]
+    if flask.request.if_none_match.contains(tag):
+        response = flask.Response(status=304)
+    else:
+        response = json_response(body(dataset))
+    response.set_etag(tag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@blueprint.before_request
+def check_vintage():
+    vintage = flask.request.args.get("vintage")
+    if vintage and vintage not in datasource.vintages():
+        flask.abort(400, "Unknown vintage: " + vintage)
+
+
+@blueprint.route("/")
+def index():
+    """
+    Values accepted by each filter of /rates.
+    """
+
+    def body(dataset):
+        table = rate_table(dataset, "CL")
+        values = {
+            field: list(dict.fromkeys(table.fields[field].tolist()))
+            for field in FILTERS
+        }
+        return dict(
+            values,
+            scenario=dataset.ranks.scenario_table.scenarios,
+            vintage=datasource.vintages(),
+            fields=FIELDS,
+            version=dataset.version,
+        )
+
+    return conditional(body)
+
+
+@blueprint.route("/rates")
+def rates():
+    """
+    Filtered, projected and paged rate records.
+    """
+    args = flask.request.args
+    scenario = args.get("scenario", "CL")
+    if scenario not in SCENARIOS:
+        flask.abort(400, "Unknown scenario: " + scenario)
+    fields = split(args.get("fields")) or FIELDS
+    for field in fields:
+        if field not in FIELDS:
+            flask.abort(400, "Unknown field: " + field)
+    filters = {field: split(args.get(field)) for field in FILTERS if args.get(field)}
+    offset = integer("offset", 0)
+    limit = integer("limit", API_PAGE_SIZE, API_MAX_PAGE_SIZE)
+
+    def body(dataset):
+        if scenario not in dataset.ranks.scenario_table.scenarios:
+            flask.abort(400, "Scenario not in the data: " + scenario)
+        table = rate_table(dataset, scenario)
+        indexes = table.select(filters)
+        page = indexes[offset : offset + limit]
+        return {
+            "data": table.records(page, fields),
+            "meta": {
+                "version": dataset.version,
+                "vintage": dataset.vintage,
+                "scenario": scenario,
+                "total": len(indexes),
+                "offset": offset,
+                "limit": limit,
+            },
+        }
+
+    return conditional(body)
+
+
+@blueprint.route("/rank")
+def rank():
+    """
+    Rank of a rate, or of a US entry, among the other OECD members.
+    """
+    args = flask.request.args
+    scenario = args.get("scenario", "CL")
+    if scenario not in SCENARIOS:
+        flask.abort(400, "Unknown scenario: " + scenario)
+    if "value" not in args and args.get("country") not in US_ENTRIES:
+        flask.abort(400, "value or country, one of USA, USA_H or USA_B, is required")
+
+    def body(dataset):
+        solver = dataset.solver
+        column = rank_column(dataset)
+        if "value" in args:
+            value = number("value")
+        else:
+            try:
+                value = solver.us(column, args["country"], scenario)
+            except KeyError as e:
+                flask.abort(400, "Not in the data: " + e.args[0])
+        return {
+            "column": column,
+            "value": value,
+            "rank": solver.rank(column, value),
+            "count": solver.count + 1,
+            "average": solver.averages[column],
+            "gap": solver.gap(column, value),
+            "above": [
+                {"name": name, "value": rate}
+                for name, rate in reversed(solver.above(column, value))
+            ],
+            "version": dataset.version,
+        }
+
+    return conditional(body)
+
+
+@blueprint.route("/break-even")
+def break_even():
+    """
+    US statutory rate at which the US reaches a rank on a rate column.
+    """
+    if "rank" not in flask.request.args:
+        flask.abort(400, "rank is required")
+    rank = integer("rank", None)
+
+    def body(dataset):
+        solver = dataset.solver
+        column = rank_column(dataset)
+        try:
+            bound = solver.bound(column, rank)
+        except ValueError as e:
+            flask.abort(400, str(e))
+        rate, status = solver.break_even(column, rank)
+        return {
+            "column": column,
+            "rank": rank,
+            "bound": bound,
+            "statutory_tax_rate": rate,
+            "status": status,
+            "version": dataset.version,
+        }
+
+    return conditional(body)
+
+
+def init_app(app):
+    """
+    Registers the API on the Dash app's server.
+    """
+    app.server.register_blueprint(
+        blueprint, url_prefix=app.config.requests_pathname_prefix + "api/v1"
+    )
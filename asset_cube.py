@@ -0,0 +1,67 @@
+"""
+Rates by asset class of the comparable jurisdictions, for section two.
+
+The metr_<asset> and aetr_<asset> columns of the data store are stacked once
+into an array indexed by (jurisdiction, asset, measure), so comparing any
+number of countries is one gather of their rows.
+"""
+
+import numpy as np
+
+# Asset columns and their labels, in the order the figure lists them
+ASSETS = {
+    "land": "Land",
+    "inventory": "Inventory",
+    "ip": "Intellectual Property",
+    "buildings": "Buildings",
+    "machines": "Machines",
+}
+
+MEASURES = ["metr", "aetr"]
+
+
+class AssetCube:
+    """
+    Rates of every comparable jurisdiction by asset class and measure.
+    """
+
+    def __init__(self, store):
+        self.assets = list(ASSETS)
+        self.measures = MEASURES
+        self.measure = {measure: i for i, measure in enumerate(self.measures)}
+        self.names = store.column("name", "comparable")
+        self.index = {
+            code: i
+            for i, code in enumerate(store.column("country", "comparable").tolist())
+        }
+        self.values = np.stack(
+            [
+                np.column_stack(
+                    [
+                        store.column(measure + "_" + asset, "comparable")
+                        for measure in self.measures
+                    ]
+                )
+                for asset in self.assets
+            ],
+            axis=1,
+        )
+        self.values.flags.writeable = False
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def rows(self, countries):
+        """
+        Row numbers of country codes.
+        """
+        return np.array([self.index[code] for code in countries], dtype=np.intp)
+
+    def compare(self, countries, measure):
+        """
+        Names of the countries and their rates of a measure by asset class,
+        one row per country.
+        """
+        rows = self.rows(countries)
+        return self.names[rows], self.values[rows, :, self.measure[measure]]
@@ -0,0 +1,26 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sections: {
+        // Figures ship without their template, which is sent once.
+        figure: function (figure, data) {
+            var layout = Object.assign({}, figure.layout, {template: data.template});
+            return Object.assign({}, figure, {layout: layout});
+        },
+        bar_figure: function (tab, data) {
+            return window.dash_clientside.sections.figure(data.bar[tab], data);
+        },
+        analysis_text: function (tab, data) {
+            return data.analysis[tab];
+        },
+        financing_figure: function (rate, data) {
+            return window.dash_clientside.sections.figure(data.financing[rate], data);
+        },
+        alternative_figure: function (alternative, tab, data) {
+            return window.dash_clientside.sections.figure(
+                data.alternative[alternative + "|" + tab], data
+            );
+        },
+        alternative_text: function (alternative, tab, data) {
+            return data.alternative_text[alternative + "|" + tab];
+        }
+    }
+});
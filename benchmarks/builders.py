@@ -0,0 +1,132 @@
+"""
+Microbenchmarks of the four figure builders.
+
+Times make_bar_figure, make_financing_figure and make_alternative_figure for
+every input combination, make_country_figure for every pair of countries
+with --pairs all or a random sample of pairs otherwise, and
+make_comparison_figure for growing numbers of countries and with the peer
+groups, and the precomputation of peer group statistics for growing numbers
+of groups, on data/output.csv and on synthetic data scaled up from it.
+
+Usage:
+
+    python benchmarks/builders.py [--scale 1 --scale 25] [--pairs N|all]
+        [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasource  # noqa: E402
+import groups  # noqa: E402
+from benchmarks import harness  # noqa: E402
+from benchmarks.synthetic import write_synthetic  # noqa: E402
+from figures import (  # noqa: E402
+    COUNTRY_RATES,
+    make_comparison_figure,
+    render,
+    states,
+)
+
+BUILDERS = {
+    "bar": "make_bar_figure",
+    "country": "make_country_figure",
+    "financing": "make_financing_figure",
+    "alternative": "make_alternative_figure",
+}
+
+COMPARISON_SIZES = [2, 10, 40, 1000]
+
+GROUP_COUNTS = [3, 100, 1000]
+GROUP_SIZE = 10
+
+
+def benchmark_states(dataset, pairs, seed=0):
+    """
+    States of every section, with all or a sample of the country pairs.
+    """
+    fixed = [(s, inputs) for s, inputs in states(dataset) if s != "country"]
+    if pairs == "all":
+        return list(states(dataset))
+    countries = dataset.store.column("country", "comparable").tolist()
+    rng = random.Random(seed)
+    sample = [
+        ("country", (rate, rng.choice(countries), rng.choice(countries)))
+        for rate in COUNTRY_RATES
+        for _ in range(int(pairs) // len(COUNTRY_RATES))
+    ]
+    return fixed + sample
+
+
+def run(dataset, label, pairs):
+    results = []
+    for section, inputs in benchmark_states(dataset, pairs):
+        name = "{}[{}-{}]".format(BUILDERS[section], label, "-".join(inputs))
+        stats = harness.measure(lambda: render(section, inputs, dataset))
+        results.append(
+            harness.entry(name, BUILDERS[section], stats, rows=len(dataset.store))
+        )
+    # Comparisons of growing peer groups, whose cost should grow linearly
+    countries = dataset.store.column("country", "comparable").tolist()
+    for count in COMPARISON_SIZES:
+        if count > len(countries):
+            break
+        name = "make_comparison_figure[{}-{}]".format(label, count)
+        stats = harness.measure(
+            lambda: make_comparison_figure(
+                countries[:count], "metr", "METR", "METRs", dataset=dataset
+            )
+        )
+        results.append(harness.entry(name, "make_comparison_figure", stats))
+    peers = ["USA", "OECD"] + list(dataset.groups.groups)
+    stats = harness.measure(
+        lambda: make_comparison_figure(peers, "metr", "METR", "METRs", dataset=dataset)
+    )
+    name = "make_comparison_figure[{}-groups]".format(label)
+    results.append(harness.entry(name, "make_comparison_figure", stats))
+    # Precomputed statistics of growing numbers of random peer groups
+    members = dataset.store.column("country", "members").tolist()
+    rng = random.Random(0)
+    for count in GROUP_COUNTS:
+        registry = {
+            "G{}".format(i): groups.Group(
+                "Group {}".format(i), rng.sample(members, min(GROUP_SIZE, len(members)))
+            )
+            for i in range(count)
+        }
+        stats = harness.measure(lambda: groups.GroupStats(dataset.store, registry))
+        name = "GroupStats[{}-{}]".format(label, count)
+        results.append(harness.entry(name, "GroupStats", stats, groups=count))
+    return results
+
+
+def main():
+    parser = harness.parser("Benchmark the figure builders.")
+    parser.add_argument(
+        "--scale",
+        type=int,
+        action="append",
+        help="copies of the data to benchmark on, may be repeated (default 1 and 25)",
+    )
+    parser.add_argument(
+        "--pairs", default="20", help="country pairs to sample, or all (default 20)"
+    )
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scale or [1, 25]:
+            if scale == 1:
+                dataset = datasource.active()
+            else:
+                dataset = datasource.Dataset(write_synthetic(scale, directory))
+            results += run(dataset, "x{}".format(scale), args.pairs)
+    harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of the policy calculator.
+
+Times calculator.rates() on batches of random parameter sets of growing
+size, which evaluates them at once by broadcasting, against a loop over
+the sets one at a time, and reports the parameter sets evaluated per second.
+
+Usage:
+
+    python benchmarks/calculator.py [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator  # noqa: E402
+from benchmarks import harness  # noqa: E402
+
+BATCH_SIZES = [1, 100, 10000, 1000000]
+LOOP_SIZE = 100
+
+
+def parameter_sets(count, seed=0):
+    """
+    Arrays of count random values of each policy parameter, within the
+    bounds of its slider.
+    """
+    rng = np.random.default_rng(seed)
+    return [
+        rng.uniform(low, high, count)
+        for _, low, high, _ in (
+            calculator.SLIDERS[parameter] for parameter in calculator.Policy._fields
+        )
+    ]
+
+
+def main():
+    parser = harness.parser("Benchmark the policy calculator.")
+    args = parser.parse_args()
+
+    results = []
+    for count in BATCH_SIZES:
+        params = parameter_sets(count)
+        stats = harness.measure(lambda: calculator.rates(*params))
+        results.append(
+            harness.entry(
+                "rates[batch-{}]".format(count),
+                "calculator",
+                stats,
+                sets_per_second=count / stats["median"],
+            )
+        )
+    params = list(zip(*parameter_sets(LOOP_SIZE)))
+    stats = harness.measure(lambda: [calculator.rates(*p) for p in params])
+    results.append(
+        harness.entry(
+            "rates[loop-{}]".format(LOOP_SIZE),
+            "calculator",
+            stats,
+            sets_per_second=LOOP_SIZE / stats["median"],
+        )
+    )
+    harness.finish(results, args)
+    for result in results:
+        print(
+            "{}: {:,.0f} parameter sets/s".format(
+                result["name"], result["extra_info"]["sets_per_second"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
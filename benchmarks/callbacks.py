@@ -0,0 +1,179 @@
+"""
+Load test of the callback endpoint.
+
+Simulated users, each a thread with its own Flask test client, post a
+random sequence of callback requests for the dashboard's inputs to
+/_dash-update-component, as the browser does when a tab, dropdown or radio
+changes. Reports the latency distribution, overall throughput and errors.
+
+With --scale above 1 the app serves synthetic data scaled up from
+data/output.csv, so the country callback draws from that many times the
+jurisdictions.
+
+Usage:
+
+    python benchmarks/callbacks.py [--users 8] [--requests 200] [--scale 1]
+        [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import harness  # noqa: E402
+from benchmarks.synthetic import write_synthetic  # noqa: E402
+
+
+def layout_values(node, values):
+    """
+    Collects the initial value of every component with an id in a layout.
+    """
+    if isinstance(node, dict):
+        props = node.get("props", {})
+        if "id" in props and "value" in props:
+            values[props["id"]] = props["value"]
+        for value in props.values():
+            layout_values(value, values)
+    elif isinstance(node, list):
+        for value in node:
+            layout_values(value, values)
+    return values
+
+
+def requests(client, countries, rng, count):
+    """
+    Bodies of count random callback requests.
+    """
+    defaults = layout_values(client.get("/_dash-layout").get_json(), {})
+    # Search callbacks and the sweep job callbacks, which queue and poll
+    # background jobs rather than build figures, are left out
+    dependencies = [
+        d
+        for d in client.get("/_dash-dependencies").get_json()
+        if d.get("clientside_function") is None
+        and not d["output"].endswith(".options")
+        and "calculator_sweep" not in d["output"]
+    ]
+    choices = {
+        "bar_figure_tabs": ["stat_tab", "metr_tab", "aetr_tab"],
+        "country_drop_rate": ["metr", "aetr"],
+        "country_drop_value1": countries,
+        "country_drop_value2": countries,
+        "financing_drop_rate": ["metr", "aetr"],
+        "alternative_radio_value": ["CL", "BONUS", "RND", "EBITDA", "FDII"],
+        "alternative_figure_tabs": ["metr_tab", "aetr_tab"],
+    }
+    bodies = []
+    for _ in range(count):
+        dependency = rng.choice(dependencies)
+        inputs = [
+            {
+                "id": i["id"],
+                "property": i["property"],
+                "value": (
+                    rng.choice(choices[i["id"]])
+                    if i["id"] in choices
+                    else defaults.get(i["id"])
+                ),
+            }
+            for i in dependency["inputs"]
+        ]
+        output_id, output_property = dependency["output"].split(".")
+        bodies.append(
+            {
+                "output": dependency["output"],
+                "outputs": {"id": output_id, "property": output_property},
+                "inputs": inputs,
+                "changedPropIds": [inputs[0]["id"] + "." + inputs[0]["property"]],
+            }
+        )
+    return bodies
+
+
+def user(app, bodies, latencies, errors):
+    client = app.server.test_client()
+    for body in bodies:
+        start = time.perf_counter()
+        response = client.post("/_dash-update-component", json=body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append((body["output"], response.status_code))
+
+
+def main():
+    parser = harness.parser("Load test the callback endpoint.")
+    parser.add_argument("--users", type=int, default=8, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=200, help="requests per user")
+    parser.add_argument("--scale", type=int, default=1, help="copies of the data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.scale > 1:
+            write_synthetic(args.scale, directory)
+            os.environ["DATA_DIR"] = directory
+        import app
+        import datasource
+
+        countries = datasource.active().store.column("country", "comparable")
+        rng = random.Random(args.seed)
+        client = app.server.test_client()
+        plans = [
+            requests(client, countries.tolist(), rng, args.requests)
+            for _ in range(args.users)
+        ]
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(target=user, args=(app.app, plan, latencies, errors))
+            for plan in plans
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    name = "update-component[x{}-users{}]".format(args.scale, args.users)
+    stats = harness.stats(latencies)
+    latencies.sort()
+    percentiles = {
+        "p{}".format(p): latencies[min(len(latencies) - 1, len(latencies) * p // 100)]
+        for p in (50, 95, 99)
+    }
+    result = harness.entry(
+        name,
+        "callbacks",
+        stats,
+        requests=len(latencies),
+        errors=len(errors),
+        throughput=len(latencies) / elapsed,
+        **percentiles
+    )
+    harness.report([result])
+    print(
+        "{} requests in {:.2f}s, {:.1f} requests/s, p95 {:.2f}ms, p99 {:.2f}ms, "
+        "{} errors".format(
+            len(latencies),
+            elapsed,
+            len(latencies) / elapsed,
+            percentiles["p95"] * 1e3,
+            percentiles["p99"] * 1e3,
+            len(errors),
+        )
+    )
+    if args.json:
+        harness.save([result], args.json)
+    if args.compare and harness.compare([result], args.compare, args.threshold):
+        sys.exit(1)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
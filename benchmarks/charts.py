@@ -0,0 +1,74 @@
+"""
+Benchmark of the chart engine against validated plotly figures.
+
+For every state of sections one, three and four, times building the figure
+dict with charts.emit(), as the callbacks do, and building the same figure
+as a validated go.Figure and converting it back to a dict, as the builders
+did before, and records the peak memory allocated by one build of each.
+
+Usage:
+
+    python benchmarks/charts.py [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import tracemalloc
+
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasource  # noqa: E402
+from benchmarks import harness  # noqa: E402
+from figures import render, states  # noqa: E402
+
+
+def peak_memory(function):
+    """
+    Peak bytes allocated by a call of function.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = harness.parser("Benchmark the chart engine against go.Figure.")
+    args = parser.parse_args()
+
+    dataset = datasource.active()
+    results = []
+    for section, inputs in states(dataset):
+        if section == "country":
+            continue
+        builds = {
+            "emit": lambda: render(section, inputs, dataset),
+            "go.Figure": lambda: go.Figure(
+                render(section, inputs, dataset)
+            ).to_plotly_json(),
+        }
+        for method, build in builds.items():
+            name = "{}[{}-{}]".format(method, section, "-".join(inputs))
+            stats = harness.measure(build)
+            results.append(
+                harness.entry(name, method, stats, peak_bytes=peak_memory(build))
+            )
+    harness.finish(results, args)
+
+    for method in ["emit", "go.Figure"]:
+        group = [r for r in results if r["group"] == method]
+        print(
+            "{}: mean median {:.3f}ms, mean peak memory {:.0f}KiB".format(
+                method,
+                sum(r["stats"]["median"] for r in group) / len(group) * 1e3,
+                sum(r["extra_info"]["peak_bytes"] for r in group) / len(group) / 1024,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of the shared figure store against building figures.
+
+For every state of sections one, three and four and a sample of
+COUNTRY_SAMPLE comparisons of section two, times building the figure, as a
+worker does on a miss of both caches, and reading it from a figure store
+filled beforehand, as a worker does when another one built it first.
+
+Usage:
+
+    python benchmarks/figure_store.py [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasource  # noqa: E402
+import figure_store  # noqa: E402
+from benchmarks import harness  # noqa: E402
+from figures import render, states  # noqa: E402
+
+COUNTRY_SAMPLE = 20
+
+
+def main():
+    parser = harness.parser("Benchmark the shared figure store.")
+    args = parser.parse_args()
+
+    dataset = datasource.active()
+    with tempfile.TemporaryDirectory() as directory:
+        store = figure_store.FigureStore(os.path.join(directory, "figures.sqlite"))
+        results = []
+        country = [state for state in states(dataset) if state[0] == "country"]
+        sample = [
+            state for state in states(dataset) if state[0] != "country"
+        ] + country[:: len(country) // COUNTRY_SAMPLE]
+        for section, inputs in sample:
+            store.put(
+                section, inputs, dataset.version, render(section, inputs, dataset)
+            )
+            builds = {
+                "render": lambda: render(section, inputs, dataset),
+                "store": lambda: store.get(section, inputs, dataset.version),
+            }
+            for method, build in builds.items():
+                name = "{}[{}-{}]".format(method, section, "-".join(inputs))
+                results.append(harness.entry(name, method, harness.measure(build)))
+    harness.finish(results, args)
+
+    for method in ["render", "store"]:
+        group = [r for r in results if r["group"] == method]
+        print(
+            "{}: mean median {:.3f}ms".format(
+                method, sum(r["stats"]["median"] for r in group) / len(group) * 1e3
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Timing, reporting and regression checks shared by the benchmark suite.
+
+Results are printed as a table and can be saved as JSON in the layout of
+pytest-benchmark (a "benchmarks" list of entries with "name", "group" and
+"stats"), so they can be kept as a CI artifact and compared with a saved
+baseline. --compare exits with status 1 when a median is slower than the
+baseline's by more than --threshold times.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+def parser(description):
+    """
+    Argument parser with the options every benchmark takes.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--json", metavar="PATH", help="save results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="compare with results saved by --json"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="slowdown ratio of the median counted as a regression (default 1.25)",
+    )
+    return parser
+
+
+def stats(times):
+    """
+    Summary of a list of timings in seconds.
+    """
+    return {
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.mean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+    }
+
+
+def measure(function, min_time=0.05, min_rounds=3, max_rounds=1000):
+    """
+    Times calls of function until min_time has passed, within the bounds on
+    the number of rounds, after one warm-up call.
+    """
+    function()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_rounds and (
+        len(times) < min_rounds or time.perf_counter() - start < min_time
+    ):
+        t = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t)
+    return stats(times)
+
+
+def entry(name, group, stats, **extra):
+    return {"name": name, "group": group, "stats": stats, "extra_info": extra}
+
+
+def report(results):
+    """
+    Prints the results as a table in milliseconds.
+    """
+    width = max([len(r["name"]) for r in results] + [4])
+    header = "{:<{}}{:>10}{:>10}{:>10}{:>10}{:>8}"
+    row = "{:<{}}{:>10.3f}{:>10.3f}{:>10.3f}{:>10.3f}{:>8}"
+    print(header.format("name", width, "min", "median", "mean", "stddev", "rounds"))
+    for result in results:
+        s = result["stats"]
+        print(
+            row.format(
+                result["name"],
+                width,
+                s["min"] * 1e3,
+                s["median"] * 1e3,
+                s["mean"] * 1e3,
+                s["stddev"] * 1e3,
+                s["rounds"],
+            )
+        )
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results, path):
+    """
+    Writes the results and the machine they ran on as JSON.
+    """
+    document = {
+        "machine_info": {
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "commit_info": {"id": commit()},
+        "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "benchmarks": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=1)
+
+
+def compare(results, path, threshold):
+    """
+    Prints the change of each median against a baseline and returns the
+    names of the benchmarks slower than threshold times the baseline.
+    """
+    with open(path) as f:
+        baseline = {b["name"]: b["stats"] for b in json.load(f)["benchmarks"]}
+    regressions = []
+    for result in results:
+        if result["name"] not in baseline:
+            continue
+        ratio = result["stats"]["median"] / baseline[result["name"]]["median"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print("{}: {:.2f}x baseline{}".format(result["name"], ratio, flag))
+    return regressions
+
+
+def finish(results, args):
+    """
+    Reports, saves and compares results as the arguments ask, and exits
+    with status 1 if any regressed.
+    """
+    report(results)
+    if args.json:
+        save(results, args.json)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,87 @@
+"""
+Benchmark of loading the data from CSV and from compiled column arrays.
+
+Times parsing each synthetic data file into column arrays, mapping its
+compiled form, and building a full DataStore from each, at 1x, 100x and
+10,000x the rows of data/output.csv by default.
+
+Usage:
+
+    python benchmarks/loader.py [--scale N ...] [--repeat N]
+        [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import harness  # noqa: E402
+from benchmarks.synthetic import write_synthetic  # noqa: E402
+from store import DataStore, compile_data, read_compiled, read_csv  # noqa: E402
+
+SCALES = [1, 100, 10000]
+
+
+def timings(function, repeat):
+    """
+    Stats of a few calls, without a warm-up call, which would parse the
+    largest files once more.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return harness.stats(times)
+
+
+def size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = harness.parser("Benchmark loading the data from CSV and compiled arrays.")
+    parser.add_argument(
+        "--scale",
+        type=int,
+        action="append",
+        help="copies of the data to load, may be repeated (default 1, 100 and 10000)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="calls timed of each (default 3)"
+    )
+    args = parser.parse_args()
+
+    results = []
+    sizes = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scale or SCALES:
+            path = write_synthetic(scale, directory)
+            # Compiled elsewhere, so DataStore(path) parses the CSV
+            compiled = compile_data(path, os.path.join(directory, str(scale)))
+            rows = len(read_compiled(compiled)[1]["country"])
+            sizes.append((scale, rows, size(path) / 1e6, size(compiled) / 1e6))
+            loads = {
+                "csv read": lambda: read_csv(path),
+                "npy map": lambda: read_compiled(compiled),
+                "csv store": lambda: DataStore(path),
+                "npy store": lambda: DataStore(compiled),
+            }
+            for group, load in loads.items():
+                name = "{}[x{}]".format(group, scale)
+                stats = timings(load, args.repeat)
+                results.append(harness.entry(name, group, stats, rows=rows))
+
+    print("{:>7}{:>10}{:>9}{:>9}".format("scale", "rows", "csv MB", "npy MB"))
+    for scale, rows, csv_size, npy_size in sizes:
+        print("{:>7}{:>10}{:>9.2f}{:>9.2f}".format(scale, rows, csv_size, npy_size))
+    harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    main()
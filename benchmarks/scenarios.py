@@ -0,0 +1,104 @@
+"""
+Benchmark of the section four scenario switch.
+
+Compares the former per-call patching of the US rows with set_index,
+combine_first and two sorts against a gather from the precomputed
+scenario table.
+
+Usage:
+
+    python benchmarks/scenarios.py [--json results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datasource  # noqa: E402
+from benchmarks import harness  # noqa: E402
+from figures import ALTERNATIVES, make_alternative_figure  # noqa: E402
+from scenarios import SCENARIOS, US_ENTRIES, ScenarioTable  # noqa: E402
+
+STORE = datasource.active().store
+output = pd.read_csv(STORE.path)
+
+
+def combine_first_ranking(rate, alternative):
+    """
+    Ranking as previously built inside make_alternative_figure.
+    """
+    data = output[0:39]
+    data_alt = output[40:]
+    data = data.sort_values(by=[rate], ascending=True).reset_index(drop=True)
+    np.average(data[rate], weights=data["weight"])
+    names = [
+        "United States (Current Law)",
+        "United States (House)",
+        "United States (Biden)",
+    ]
+    locs = [int(data[data["name"] == name].index[0]) for name in names]
+    if alternative != "CL":
+        s = SCENARIOS.index(alternative)
+        for prefix, loc in zip(US_ENTRIES.values(), locs):
+            alt = data_alt[data_alt["country"] == prefix + str(s)]
+            alt = alt.set_index([pd.Index([loc])])
+            data.loc[alt.index] = np.nan
+            data = data.combine_first(alt)
+    data = data.sort_values(by=[rate], ascending=True).reset_index(drop=True)
+    locs = [int(data[data["name"] == name].index[0]) for name in names]
+    return data["name"], data[rate], locs
+
+
+def table_ranking(table, rate, alternative):
+    """
+    Ranking from the precomputed scenario table.
+    """
+    order, values = table.ranked(alternative, rate)
+    return table.names[order], values, table.positions(order)
+
+
+def main():
+    parser = harness.parser("Benchmark the section four scenario switch.")
+    args = parser.parse_args()
+
+    table = ScenarioTable(STORE)
+    results = [
+        harness.entry(
+            "ScenarioTable build",
+            "scenarios",
+            harness.measure(lambda: ScenarioTable(STORE)),
+        )
+    ]
+    speedups = []
+    for rate in ["metr_overall", "aetr_overall"]:
+        for alternative in ALTERNATIVES:
+            key = "{}-{}".format(rate, alternative)
+            old = harness.measure(lambda: combine_first_ranking(rate, alternative))
+            new = harness.measure(lambda: table_ranking(table, rate, alternative))
+            results.append(
+                harness.entry("combine_first[{}]".format(key), "scenarios", old)
+            )
+            results.append(harness.entry("table[{}]".format(key), "scenarios", new))
+            speedups.append((key, old["median"] / new["median"]))
+    results.append(
+        harness.entry(
+            "make_alternative_figure[FDII]",
+            "scenarios",
+            harness.measure(
+                lambda: make_alternative_figure(
+                    "metr_overall", "METRs", "METR", "FDII", [-0.20, 0.20]
+                )
+            ),
+        )
+    )
+    harness.finish(results, args)
+    for key, speedup in speedups:
+        print("{}: scenario table {:,.0f}x faster".format(key, speedup))
+
+
+if __name__ == "__main__":
+    main()
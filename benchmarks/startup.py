@@ -0,0 +1,107 @@
+"""
+Benchmark of the app's cold start.
+
+Starts a fresh interpreter several times and in each one times importing the
+app, the first /_dash-layout request and the first callback request through
+the Flask test client, which is what a newly started worker goes through
+before it serves its first page. Reports the statistics of each step, and
+whether pandas was imported.
+
+Usage:
+
+    python benchmarks/startup.py [--runs N] [--json results.json]
+        [--compare baseline.json]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import harness  # noqa: E402
+
+# Run in each child interpreter, from the repository root
+CHILD = """
+import json, sys, time
+
+start = time.perf_counter()
+import app
+
+imported = time.perf_counter()
+client = app.server.test_client()
+response = client.get("/_dash-layout")
+assert response.status_code == 200
+layout = time.perf_counter()
+response = client.post(
+    "/_dash-update-component",
+    json={
+        "output": "country_figure.figure",
+        "outputs": {"id": "country_figure", "property": "figure"},
+        "inputs": [
+            {"id": "country_drop_rate", "property": "value", "value": "metr"},
+            {"id": "country_drop_value1", "property": "value", "value": "USA"},
+            {"id": "country_drop_value2", "property": "value", "value": "OECD"},
+            {"id": "country_drop_vintage", "property": "value", "value": None},
+            {"id": "country_drop_peers", "property": "value", "value": []},
+        ],
+        "changedPropIds": ["country_drop_rate.value"],
+    },
+)
+assert response.status_code == 200
+callback = time.perf_counter()
+json.dump(
+    {
+        "import": imported - start,
+        "first layout": layout - imported,
+        "first callback": callback - layout,
+        "total": callback - start,
+        "pandas loaded": "pandas" in sys.modules,
+    },
+    sys.stdout,
+)
+"""
+
+STEPS = ["import", "first layout", "first callback", "total"]
+
+
+def run():
+    """
+    Timings of one cold start, in seconds.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = harness.parser(__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--runs", type=int, default=5, help="cold starts to time (default 5)"
+    )
+    args = parser.parse_args()
+
+    runs = [run() for _ in range(args.runs)]
+    pandas_loaded = any(r["pandas loaded"] for r in runs)
+    results = [
+        harness.entry(
+            step,
+            "startup",
+            harness.stats([r[step] for r in runs]),
+            pandas_loaded=pandas_loaded,
+        )
+        for step in STEPS
+    ]
+    harness.finish(results, args)
+    print("pandas loaded:", pandas_loaded)
+
+
+if __name__ == "__main__":
+    main()
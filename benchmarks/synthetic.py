@@ -0,0 +1,48 @@
+"""
+Synthetic data files scaled up from data/output.csv.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import ALTERNATIVE_PATTERN, DATA_FILE, OECD, TEXT_COLUMNS, US  # noqa: E402
+
+
+def synthetic(scale, seed=0):
+    """
+    The rows of data/output.csv followed by scale - 1 copies of the member
+    countries other than the US, with new country codes and perturbed rates,
+    so the copies rank as additional jurisdictions. The US entries, the OECD
+    aggregate and the weights are left as they are.
+    """
+    base = pd.read_csv(DATA_FILE)
+    if scale == 1:
+        return base
+    rng = np.random.default_rng(seed)
+    members = base[
+        ~base["country"].isin(US + [OECD])
+        & ~base["country"].str.match(ALTERNATIVE_PATTERN)
+    ]
+    rates = [c for c in base.columns if c not in TEXT_COLUMNS + ["weight"]]
+    copies = [base]
+    for i in range(1, scale):
+        copy = members.copy()
+        copy["country"] = copy["country"] + "~" + str(i)
+        copy["name"] = copy["name"] + " " + str(i)
+        copy[rates] = copy[rates] + rng.normal(0, 0.01, (len(copy), len(rates)))
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def write_synthetic(scale, directory):
+    """
+    Writes a synthetic data file and returns its path.
+    """
+    path = os.path.join(directory, "output_x{}.csv".format(scale))
+    synthetic(scale).to_csv(path, index=False, float_format="%.4f")
+    return path
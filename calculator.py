@@ -0,0 +1,224 @@
+"""
+Cost of capital calculator of US effective tax rates under user-defined policy.
+
+Section four shows the four alternative policies estimated in data/output.csv.
+This calculator instead computes the rates of the data's columns for any
+combination of five policy parameters, following the framework of Devereux
+and Griffith (1999) without personal taxes:
+
+    statutory_rate       combined federal and state corporate tax rate
+    bonus                share of investment in machines deducted at once
+    rnd_expensing        share of research and development costs deducted at
+                         once, the rest amortized over five years
+    interest_deductible  share of interest expense deductible under the
+                         limitation on interest deductions
+    fdii_rate            rate on the returns to intellectual property, which
+                         the deduction for FDII lowers below the statutory
+                         rate, and never above it
+
+For each asset class and form of financing, the cost of capital is
+
+    p = (1 - A) / (1 - t) * (rho - pi + delta * (1 + pi)) / (1 + pi) - delta
+
+where A is the present value of the tax allowances of one unit of
+investment, t the rate on its returns, rho the firm's nominal discount rate
+(lowered for debt by the deductible interest), pi inflation and delta
+economic depreciation. The METR is (p - r) / p for the real rate r,
+undefined (NaN) where p is below MIN_COST, and the AETR, at a profit rate of
+PROFIT_RATE, (p - r) / PROFIT_RATE + t * (1 - p / PROFIT_RATE). Rates of
+several assets or forms of financing are those of their weighted mean cost
+of capital, and the weighted mean of their AETRs.
+
+The economic assumptions below are a stylized calibration to the US, so the
+calculator's current law approximates, but does not reproduce, the published
+estimates; section five, the rank solver and the sweep add its change from
+current law to the US estimates of the data. rates() evaluates arrays of
+parameter sets at once by broadcasting; calculate() memoizes the rates of
+single parameter sets.
+"""
+
+import collections
+import functools
+import os
+
+import numpy as np
+
+from asset_cube import ASSETS
+
+CALCULATOR_CACHE_SIZE = int(os.environ.get("CALCULATOR_CACHE_SIZE", 4096))
+
+REAL_RATE = 0.05
+INFLATION = 0.02
+PROFIT_RATE = 0.20
+DEBT_SHARE = 0.32
+
+# Cost of capital below which the METR is undefined: as p nears zero the
+# METR diverges, and a negative p makes it meaningless
+MIN_COST = 0.01
+
+Policy = collections.namedtuple(
+    "Policy",
+    ["statutory_rate", "bonus", "rnd_expensing", "interest_deductible", "fdii_rate"],
+)
+
+# US current law in the long run, as the published estimates assume
+CURRENT_LAW = Policy(
+    statutory_rate=0.258,
+    bonus=0.0,
+    rnd_expensing=0.0,
+    interest_deductible=0.6,
+    fdii_rate=0.25,
+)
+
+# Label, minimum, maximum and step of each parameter's slider
+SLIDERS = {
+    "statutory_rate": ("Statutory Tax Rate", 0.0, 0.5, 0.005),
+    "bonus": ("Bonus Depreciation (Machines)", 0.0, 1.0, 0.05),
+    "rnd_expensing": ("R&D Expensing", 0.0, 1.0, 0.05),
+    "interest_deductible": ("Deductible Share of Interest", 0.0, 1.0, 0.05),
+    "fdii_rate": ("Tax Rate on IP Income (FDII)", 0.0, 0.5, 0.005),
+}
+
+Asset = collections.namedtuple(
+    "Asset", ["depreciation", "schedule", "allowance", "weight"]
+)
+Asset.__doc__ = """
+Economic depreciation rate, tax depreciation schedule ("db" declining
+balance at rate allowance, "sl" straight line over allowance years, or None)
+and share of the capital stock of an asset class.
+"""
+
+ASSET_PARAMETERS = {
+    "land": Asset(0.0, None, 0, 0.10),
+    "inventory": Asset(0.0, None, 0, 0.15),
+    "ip": Asset(0.15, "sl", 5, 0.10),
+    "buildings": Asset(0.0314, "sl", 39, 0.25),
+    "machines": Asset(0.1225, "db", 0.2, 0.40),
+}
+
+# Policy parameters expensing a share of an asset class, or taxing its returns
+EXPENSING = {"machines": "bonus", "ip": "rnd_expensing"}
+INCOME_RATES = {"ip": "fdii_rate"}
+
+FINANCING = ["equity", "debt"]
+
+ASSET_ORDER = list(ASSETS)
+DEPRECIATION = np.array([ASSET_PARAMETERS[a].depreciation for a in ASSET_ORDER])
+ASSET_WEIGHTS = np.array([ASSET_PARAMETERS[a].weight for a in ASSET_ORDER])
+FINANCING_WEIGHTS = np.array([1 - DEBT_SHARE, DEBT_SHARE])
+
+MEASURES = (
+    [
+        "statutory_tax_rate",
+        "metr_overall",
+        "aetr_overall",
+        "metr_equity_overall",
+        "metr_debt_overall",
+        "metr_debt_bias",
+        "aetr_equity_overall",
+        "aetr_debt_overall",
+        "aetr_debt_bias",
+    ]
+    + ["metr_" + asset for asset in ASSET_ORDER]
+    + ["aetr_" + asset for asset in ASSET_ORDER]
+)
+
+
+def present_value(asset, rho):
+    """
+    Present value of the tax depreciation of one unit of an asset, at
+    discount rates rho.
+    """
+    if asset.schedule == "db":
+        return asset.allowance * (1 + rho) / (asset.allowance + rho)
+    if asset.schedule == "sl":
+        life = asset.allowance
+        return (1 + rho) / (rho * life) * (1 - (1 + rho) ** -life)
+    return np.zeros_like(rho)
+
+
+def metr(cost):
+    """
+    METR of costs of capital, NaN where a cost is below MIN_COST.
+    """
+    safe = np.where(cost < MIN_COST, np.nan, cost)
+    return (safe - REAL_RATE) / safe
+
+
+def rates(statutory_rate, bonus, rnd_expensing, interest_deductible, fdii_rate):
+    """
+    Rates of the MEASURES columns for parameter values, which may be arrays
+    broadcast against each other. Returns a dict of arrays of their shape.
+    """
+    params = Policy(
+        *np.broadcast_arrays(
+            *[
+                np.asarray(p, dtype=float)
+                for p in (
+                    statutory_rate,
+                    bonus,
+                    rnd_expensing,
+                    interest_deductible,
+                    fdii_rate,
+                )
+            ]
+        )
+    )
+    shape = params.statutory_rate.shape
+    # Arrays indexed by (parameter set, financing, asset)
+    tax = params.statutory_rate.reshape(-1, 1, 1)
+    nominal = (1 + REAL_RATE) * (1 + INFLATION) - 1
+    deductible = tax * params.interest_deductible.reshape(-1, 1, 1)
+    rho = nominal * (1 - np.concatenate([np.zeros_like(tax), deductible], axis=1))
+    income_rates = np.empty((tax.shape[0], 1, len(ASSET_ORDER)))
+    allowances = np.empty((tax.shape[0], len(FINANCING), len(ASSET_ORDER)))
+    for j, name in enumerate(ASSET_ORDER):
+        asset = ASSET_PARAMETERS[name]
+        income = INCOME_RATES.get(name, "statutory_rate")
+        income_rates[:, 0, j] = np.minimum(
+            getattr(params, income), params.statutory_rate
+        ).ravel()
+        z = present_value(asset, rho[:, :, 0])
+        if name in EXPENSING:
+            share = getattr(params, EXPENSING[name]).reshape(-1, 1)
+            z = share + (1 - share) * z
+        allowances[:, :, j] = tax[:, :, 0] * z
+
+    cost = (1 - allowances) / (1 - income_rates) * (
+        rho - INFLATION + DEPRECIATION * (1 + INFLATION)
+    ) / (1 + INFLATION) - DEPRECIATION
+    aetr = (cost - REAL_RATE) / PROFIT_RATE + income_rates * (1 - cost / PROFIT_RATE)
+
+    by_financing = np.einsum("nfa,a->nf", cost, ASSET_WEIGHTS)
+    by_asset = np.einsum("nfa,f->na", cost, FINANCING_WEIGHTS)
+    aetr_by_financing = np.einsum("nfa,a->nf", aetr, ASSET_WEIGHTS)
+    aetr_by_asset = np.einsum("nfa,f->na", aetr, FINANCING_WEIGHTS)
+    overall = by_financing @ FINANCING_WEIGHTS
+
+    columns = {
+        "statutory_tax_rate": params.statutory_rate.ravel(),
+        "metr_overall": metr(overall),
+        "aetr_overall": aetr_by_financing @ FINANCING_WEIGHTS,
+        "metr_equity_overall": metr(by_financing[:, 0]),
+        "metr_debt_overall": metr(by_financing[:, 1]),
+        "aetr_equity_overall": aetr_by_financing[:, 0],
+        "aetr_debt_overall": aetr_by_financing[:, 1],
+    }
+    columns["metr_debt_bias"] = (
+        columns["metr_equity_overall"] - columns["metr_debt_overall"]
+    )
+    columns["aetr_debt_bias"] = (
+        columns["aetr_equity_overall"] - columns["aetr_debt_overall"]
+    )
+    for j, asset in enumerate(ASSET_ORDER):
+        columns["metr_" + asset] = metr(by_asset[:, j])
+        columns["aetr_" + asset] = aetr_by_asset[:, j]
+    return {measure: columns[measure].reshape(shape) for measure in MEASURES}
+
+
+@functools.lru_cache(maxsize=CALCULATOR_CACHE_SIZE)
+def calculate(policy):
+    """
+    Rates of the MEASURES columns for one Policy, as floats.
+    """
+    return {measure: float(value) for measure, value in rates(*policy).items()}
@@ -0,0 +1,160 @@
+"""
+Declarative engine for the ranked bar charts of sections one, three and four.
+
+These figures rank the jurisdictions by one rate and are drawn from the same
+parts: bars with the three US entries picked out in their colors, markers of
+other columns in the same order, the OECD average as a dashed line labelled
+in the middle, and a static layout. A section describes its figure as a
+ChartSpec of those parts, and emit() turns the spec into the figure dict
+that go.Figure(...).to_plotly_json() would return, without building and
+validating plotly objects. The page template and the color lists are built
+once per process. Figures share the color lists, which are tuples, and each
+gets its own copy of the template, so changing one figure cannot change
+another.
+"""
+
+import collections
+import copy
+import functools
+
+import plotly.io as pio
+
+# Not public plotly API: the serializers go.Figure itself uses, so the pinned
+# plotly version in requirements.txt must be checked on upgrade
+from _plotly_utils.utils import convert_to_base64, to_typed_array_spec
+
+# Colors of the US current law, House and Biden entries
+US_COLORS = ["#00D56F", "#FFB400", "#FF8100"]
+
+ChartSpec = collections.namedtuple(
+    "ChartSpec", ["rate", "alternative", "traces", "layout"]
+)
+ChartSpec.__doc__ = """
+Figure ranking the jurisdictions by a rate, under a scenario if not None,
+with a list of traces and a layout dict.
+"""
+
+Bars = collections.namedtuple("Bars", ["name", "color"])
+Bars.__doc__ = "Bars of the ranked rate."
+
+Points = collections.namedtuple("Points", ["column", "name", "color", "marker"])
+Points.__doc__ = "Markers of another column, with extra marker properties."
+
+Average = collections.namedtuple("Average", ["name", "label", "color"])
+Average.__doc__ = "Dashed line of the weighted OECD average of the current law rate."
+
+PolicyMarkers = collections.namedtuple("PolicyMarkers", ["name", "hovertemplate"])
+PolicyMarkers.__doc__ = "Asterisks above the US entries under an alternative policy."
+
+
+@functools.lru_cache(maxsize=None)
+def default_template():
+    template = pio.templates[pio.templates.default].to_plotly_json()
+    convert_to_base64(template)
+    return template
+
+
+def template():
+    """
+    Dict of the default plotly template, as go.Figure embeds it. A copy of
+    the one built per process, as figures may be changed by their users.
+    """
+    return copy.deepcopy(default_template())
+
+
+@functools.lru_cache(maxsize=256)
+def colors(color, us, count):
+    """
+    Marker colors of count ranked jurisdictions, with the US entries at
+    positions us in their own colors. A tuple, as it is shared by figures.
+    """
+    colors = [color] * max(100, count)
+    for position, us_color in zip(us, US_COLORS):
+        if position is not None:
+            colors[position] = us_color
+    return tuple(colors)
+
+
+def bars(trace, ranking, current, store):
+    return {
+        "marker": {"color": colors(trace.color, tuple(ranking.us), len(ranking.names))},
+        "name": trace.name,
+        "x": ranking.names.tolist(),
+        "y": to_typed_array_spec(ranking.values),
+        "type": "bar",
+    }
+
+
+def points(trace, ranking, current, store):
+    marker = dict(trace.marker)
+    marker["color"] = colors(trace.color, tuple(ranking.us), len(ranking.names))
+    return {
+        "marker": marker,
+        "mode": "markers",
+        "name": trace.name,
+        "x": ranking.names.tolist(),
+        "y": to_typed_array_spec(store.column(trace.column, "ranked")[ranking.order]),
+        "type": "scatter",
+    }
+
+
+def average(trace, ranking, current, store):
+    names = ranking.names
+    oecd_avg = current.oecd_avg
+    return {
+        "hoverlabel": {"bgcolor": trace.color},
+        "hovertemplate": "(OECD Average, %{y})",
+        "line": {"color": trace.color, "dash": "dash"},
+        "mode": "lines+text",
+        "name": trace.name,
+        "text": ["", "OECD Average " + trace.label, ""],
+        "textfont": {"color": trace.color},
+        "textposition": "top center",
+        "x": [names[0], names[12], names[-1]],
+        "y": [oecd_avg, oecd_avg, oecd_avg],
+        "type": "scatter",
+    }
+
+
+def policy_markers(trace, ranking, current, store):
+    entries = [
+        (position, color)
+        for position, color in zip(ranking.us, US_COLORS)
+        if position is not None
+    ]
+    return {
+        "hovertemplate": trace.hovertemplate,
+        "marker": {
+            "line": {"color": [color for _, color in entries], "width": 1},
+            "size": 8,
+            "symbol": "asterisk",
+        },
+        "mode": "markers",
+        "name": trace.name,
+        "x": [str(ranking.names[position]) for position, _ in entries],
+        "y": [float(ranking.values[position]) + 0.015 for position, _ in entries],
+        "type": "scatter",
+    }
+
+
+# Function building each kind of trace from the ranking of the spec, the
+# current law ranking and the data store
+TRACES = {
+    Bars: bars,
+    Points: points,
+    Average: average,
+    PolicyMarkers: policy_markers,
+}
+
+
+def emit(spec, dataset):
+    """
+    Figure dict of a chart spec on a dataset.
+    """
+    ranking = dataset.ranks.get(spec.rate, spec.alternative)
+    current = dataset.ranks.get(spec.rate)
+    data = [
+        TRACES[type(trace)](trace, ranking, current, dataset.store)
+        for trace in spec.traces
+    ]
+    return {"data": data, "layout": dict(spec.layout, template=template())}
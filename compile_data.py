@@ -0,0 +1,33 @@
+"""
+Compiles CSV data files to memory-mapped column arrays.
+
+Each file is written to a directory next to it (data/output.csv becomes
+data/output.columns/) holding one .npy array per column and a meta.json
+with the data version. The server loads the compiled form whenever it is
+newer than the CSV it was built from, so every worker maps the same pages
+instead of holding its own parsed copy.
+
+Usage:
+
+    python compile_data.py data/output.csv
+"""
+
+import argparse
+
+from store import DATA_FILE, compile_data
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compile CSV data files to memory-mapped column arrays."
+    )
+    parser.add_argument(
+        "paths", nargs="*", default=[DATA_FILE], help="CSV data files to compile"
+    )
+    args = parser.parse_args()
+    for path in args.paths:
+        print("Compiled {} to {}".format(path, compile_data(path)))
+
+
+if __name__ == "__main__":
+    main()
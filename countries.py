@@ -0,0 +1,75 @@
+"""
+Registry of the jurisdictions that can be compared in section two.
+
+The dropdown options are generated from the comparable partition of the
+data store rather than written out in the layout, so they follow the data
+file. Options are ordered by name, with the US entries in file order and the
+OECD average among the countries, as the page has always listed them.
+
+Only the first COUNTRY_PAGE_SIZE options, plus the selected one, are sent
+with the page. The dropdowns ask the server for matches as the user types,
+so larger jurisdiction sets do not grow the layout.
+"""
+
+import os
+
+COUNTRY_PAGE_SIZE = int(os.environ.get("COUNTRY_PAGE_SIZE", 100))
+
+
+def sort_key(name):
+    """
+    Name a jurisdiction is listed under, e.g. United States (House) under
+    United States.
+    """
+    return name.split(" (")[0]
+
+
+class CountryRegistry:
+    """
+    Codes and labels of the comparable jurisdictions of one data store.
+    """
+
+    def __init__(self, store):
+        codes = store.column("country", "comparable").tolist()
+        names = store.column("name", "comparable").tolist()
+        listed = sorted(zip(codes, names), key=lambda entry: sort_key(entry[1]))
+        self.codes = [code for code, _ in listed]
+        self.labels = dict(listed)
+        self.position = {code: i for i, code in enumerate(self.codes)}
+        # Lower case text searched for each code
+        self.search_text = {code: (code + " " + name).lower() for code, name in listed}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.labels
+
+    def option(self, code):
+        return {"label": self.labels[code], "value": code}
+
+    def search(self, query="", limit=COUNTRY_PAGE_SIZE):
+        """
+        Codes whose name or code contains the query, at most limit of them.
+        """
+        query = (query or "").strip().lower()
+        matches = []
+        for code in self.codes:
+            if len(matches) == limit:
+                break
+            if query in self.search_text[code]:
+                matches.append(code)
+        return matches
+
+    def options(self, selected=None, query="", limit=COUNTRY_PAGE_SIZE):
+        """
+        Dropdown options matching a query, always including the selected code,
+        or codes when selected is a list.
+        """
+        codes = self.search(query, limit)
+        selected = selected if isinstance(selected, list) else [selected]
+        missing = [code for code in selected if code in self and code not in codes]
+        if missing:
+            codes.extend(missing)
+            codes.sort(key=self.position.get)
+        return [self.option(code) for code in codes]
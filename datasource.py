@@ -0,0 +1,242 @@
+"""
+Versioned, partitioned data source with hot reloading.
+
+Each data vintage (one cross-section of estimates, e.g. a year) is a
+partition. With DATA_DIR set, every *.csv in that directory is a vintage
+named by its file stem, e.g. 2019.csv or 2021-10-13.csv, and the newest by
+name is the default. Otherwise data/output.csv is the only vintage, named
+DATA_VINTAGE.
+
+A Dataset bundles the data store of one vintage and the indexes derived
+from it. The default dataset is replaced as a whole by rebinding one
+module-level reference, so a request that reads active() once sees a
+single consistent version. Other vintages are loaded on first use and kept
+in a least recently used cache bounded by PARTITION_MEMORY_MB.
+
+A watcher thread polls the data files by mtime and size. When the default
+vintage changes content it builds the new Dataset and runs the on_load
+hooks, such as warming the figure cache, before swapping it in; changed
+non-default vintages are dropped and reloaded on their next use.
+"""
+
+import collections
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from asset_cube import AssetCube
+from countries import CountryRegistry
+from groups import GroupStats
+from rankings import RankIndex
+from solver import RankSolver
+from store import DATA_FILE, DataStore
+
+DATA_DIR = os.environ.get("DATA_DIR")
+DATA_VINTAGE = os.environ.get("DATA_VINTAGE", "2021")
+PARTITION_MEMORY = float(os.environ.get("PARTITION_MEMORY_MB", 256)) * 2**20
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset:
+    """
+    A data store of one vintage and the indexes derived from it.
+    """
+
+    def __init__(self, path, vintage=DATA_VINTAGE):
+        self.path = path
+        self.vintage = vintage
+        self.signature = signature(path)
+        self.store = DataStore(path)
+        self.ranks = RankIndex(self.store)
+        self.countries = CountryRegistry(self.store)
+        self.assets = AssetCube(self.store)
+        self.groups = GroupStats(self.store)
+        self.solver = RankSolver(self.store, self.ranks)
+        self.version = self.store.version
+        self.loaded = time.time()
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory held by the dataset's arrays.
+        """
+        return (
+            self.store.nbytes
+            + self.ranks.nbytes
+            + self.assets.nbytes
+            + self.groups.nbytes
+            + self.solver.nbytes
+        )
+
+
+def vintage_files():
+    """
+    Data file of each available vintage, oldest first.
+    """
+    if DATA_DIR:
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, "*.csv")))
+        if paths:
+            return {os.path.splitext(os.path.basename(p))[0]: p for p in paths}
+    return {DATA_VINTAGE: DATA_FILE}
+
+
+def vintages():
+    """
+    Names of the available vintages, oldest first.
+    """
+    return list(vintage_files())
+
+
+def vintage_path(vintage):
+    """
+    Data file of a vintage.
+    """
+    return vintage_files()[vintage]
+
+
+def signature(path):
+    """
+    Cheap change check of a file.
+    """
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path):
+    """
+    SHA-256 of a file, matching DataStore.version.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+_default = vintages()[-1]
+_active = Dataset(vintage_path(_default), _default)
+_partitions = collections.OrderedDict()
+_lock = threading.RLock()
+_hooks = []
+_watcher_pid = None
+
+
+def active():
+    """
+    The dataset of the default vintage.
+    """
+    return _active
+
+
+def get(vintage=None):
+    """
+    The dataset of a vintage, loading it if needed. None means the default.
+    """
+    dataset = _active
+    if vintage is None or vintage == dataset.vintage:
+        return dataset
+    with _lock:
+        if vintage in _partitions:
+            _partitions.move_to_end(vintage)
+            return _partitions[vintage]
+    dataset = Dataset(vintage_path(vintage), vintage)
+    with _lock:
+        _partitions[vintage] = dataset
+        evict(keep=vintage)
+    return dataset
+
+
+def evict(keep=None):
+    """
+    Drops least recently used vintages until the loaded ones fit in
+    PARTITION_MEMORY. The default and the keep vintage are never dropped.
+    """
+    with _lock:
+        total = _active.nbytes + sum(d.nbytes for d in _partitions.values())
+        for vintage in list(_partitions):
+            if total <= PARTITION_MEMORY:
+                break
+            if vintage != keep:
+                total -= _partitions.pop(vintage).nbytes
+
+
+def loaded():
+    """
+    Names of the vintages currently in memory.
+    """
+    with _lock:
+        return [_active.vintage] + list(_partitions)
+
+
+def on_load(hook):
+    """
+    Registers hook(dataset), run on each new default dataset before it is
+    swapped in.
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def swap(dataset):
+    """
+    Prepares a dataset with the on_load hooks and makes it the default.
+    """
+    global _active
+    for hook in _hooks:
+        hook(dataset)
+    with _lock:
+        _partitions.pop(dataset.vintage, None)
+        _active = dataset
+    logger.info(
+        "Serving %s data %s from %s",
+        dataset.vintage,
+        dataset.version[:12],
+        dataset.path,
+    )
+
+
+def reload():
+    """
+    Reloads changed data files. Returns True if a new default dataset is active.
+    """
+    with _lock:
+        for vintage, dataset in list(_partitions.items()):
+            if not os.path.exists(dataset.path) or (
+                signature(dataset.path) != dataset.signature
+            ):
+                del _partitions[vintage]
+
+        vintage = vintages()[-1]
+        path = vintage_path(vintage)
+        if signature(path) == _active.signature:
+            return False
+        if vintage == _active.vintage and file_hash(path) == _active.version:
+            _active.signature = signature(path)
+            return False
+        swap(Dataset(path, vintage))
+        return True
+
+
+def poll(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            reload()
+        except Exception:
+            logger.exception("Reloading data failed")
+
+
+def watch(interval):
+    """
+    Starts the watcher thread once per process. Safe to call on every
+    request, so workers forked from a preloaded master start their own.
+    """
+    global _watcher_pid
+    if _watcher_pid == os.getpid():
+        return
+    with _lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+        threading.Thread(target=poll, args=(interval,), daemon=True).start()
@@ -0,0 +1,304 @@
+"""
+Data export route.
+
+GET /download streams the estimates as CSV, JSON or Parquet. Query
+parameters choose the subset, each as a comma separated list:
+
+    format     csv (default), json or parquet
+    sections   partitions of the data store, e.g. ranked (default), oecd,
+               alternatives, or all for every row
+    scenarios  alternative policies (CL, BONUS, ...); the ranked
+               jurisdictions with the US entries under each policy, for
+               the vintages whose data has it
+    measures   rate columns, all by default
+    vintages   data vintages, or all; the default vintage otherwise
+
+Rows are written a chunk at a time, and vintages that are not in memory are
+read one at a time and dropped after, so an export of many vintages holds
+one vintage at most. As it is streamed, each export is also written to
+EXPORT_DIR under a key made of its parameters and the versions of its data
+files, and later requests for it are served from that file. The listed
+values are put in the order of the data, so that the same subset has one
+key whatever the order of the query, and EXPORT_DIR holds at most
+EXPORT_DIR_MB of exports, dropping the least recently served first.
+
+Parquet needs the optional pyarrow package.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+
+import flask
+import numpy as np
+
+import datasource
+from scenarios import SCENARIOS, ScenarioTable
+from store import DataStore
+from util import atomic_path, has_pyarrow, prune, split
+
+EXPORT_DIR = os.environ.get(
+    "EXPORT_DIR", os.path.join(tempfile.gettempdir(), "oecd-tax-burden-exports")
+)
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 10000))
+EXPORT_DIR_MAX_BYTES = float(os.environ.get("EXPORT_DIR_MB", 512)) * 2**20
+EXPORT_NAME = "OECD-Effective-Tax-Rates"
+
+FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class Selection:
+    """
+    Validated subset of the data chosen by the query parameters.
+    """
+
+    def __init__(self, args):
+        store = datasource.active().store
+        self.format = args.get("format", "csv")
+        if self.format not in FORMATS:
+            flask.abort(400, "Unknown format: " + self.format)
+
+        sections = split(args.get("sections")) or ["ranked"]
+        if sections == ["all"]:
+            sections = list(store.partitions)
+        self.sections = choose(sections, store.partitions, "section")
+
+        self.scenarios = choose(split(args.get("scenarios")), SCENARIOS, "scenario")
+        if self.scenarios and self.sections != ["ranked"]:
+            flask.abort(400, "Scenarios apply to the ranked section only")
+
+        measures = split(args.get("measures")) or store.measures
+        self.measures = choose(measures, store.measures, "measure")
+
+        vintages = split(args.get("vintages"))
+        if vintages == ["all"]:
+            vintages = datasource.vintages()
+        self.vintages = choose(vintages, datasource.vintages(), "vintage") or [
+            datasource.active().vintage
+        ]
+
+        # Columns naming the block a row belongs to
+        self.labels = []
+        if "vintages" in args:
+            self.labels.append("vintage")
+        if self.scenarios:
+            self.labels.append("scenario")
+        self.columns = self.labels + ["country", "name"] + self.measures + ["weight"]
+
+    def key(self):
+        """
+        Digest of the selection and the current files of its vintages.
+        """
+        parts = [
+            self.format,
+            self.sections,
+            self.scenarios,
+            self.measures,
+            self.labels,
+            [datasource.signature(datasource.vintage_path(v)) for v in self.vintages],
+        ]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:32]
+
+
+def choose(values, allowed, kind):
+    """
+    The values, in the order of allowed, if each one is allowed.
+    """
+    for value in values:
+        if value not in allowed:
+            flask.abort(400, "Unknown {}: {}".format(kind, value))
+    return [value for value in allowed if value in values]
+
+
+def vintage_store(vintage):
+    """
+    Data store of a vintage, without loading it into the partition cache.
+    """
+    if vintage in datasource.loaded():
+        return datasource.get(vintage).store
+    return DataStore(datasource.vintage_path(vintage))
+
+
+def blocks(selection):
+    """
+    Labels and column arrays of the selected rows, one block per vintage
+    and scenario.
+    """
+    for vintage in selection.vintages:
+        store = vintage_store(vintage)
+        if selection.scenarios:
+            table = ScenarioTable(store)
+            for scenario in selection.scenarios:
+                # Vintages without the alternative rows have no such block
+                if scenario not in table.scenarios:
+                    continue
+                s = SCENARIOS.index(scenario)
+                columns = {
+                    "country": store.column("country", "ranked"),
+                    "name": store.column("name", "ranked"),
+                    "weight": store.column("weight", "ranked"),
+                }
+                for measure in selection.measures:
+                    columns[measure] = table.values[s, :, table.column[measure]]
+                yield {"vintage": vintage, "scenario": scenario}, columns
+        else:
+            rows = np.unique(
+                np.concatenate(
+                    [
+                        np.arange(len(store))[store.partitions[section]]
+                        for section in selection.sections
+                    ]
+                )
+            )
+            columns = {
+                name: store.column(name)[rows]
+                for name in ["country", "name"] + selection.measures + ["weight"]
+            }
+            yield {"vintage": vintage}, columns
+
+
+def chunks(selection):
+    """
+    Rows of the export as lists of values, EXPORT_CHUNK_ROWS at a time.
+    """
+    data_columns = selection.columns[len(selection.labels) :]
+    for labels, columns in blocks(selection):
+        size = len(columns["country"])
+        for start in range(0, size, EXPORT_CHUNK_ROWS):
+            stop = min(start + EXPORT_CHUNK_ROWS, size)
+            values = [columns[name][start:stop].tolist() for name in data_columns]
+            prefix = [labels[label] for label in selection.labels]
+            yield [prefix + list(row) for row in zip(*values)]
+
+
+def missing(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def csv_stream(selection):
+    """
+    CSV text of the export, with a leading unnamed row number column as
+    written by pandas.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([""] + selection.columns)
+    number = 0
+    for chunk in chunks(selection):
+        for row in chunk:
+            writer.writerow([number] + ["" if missing(v) else v for v in row])
+            number += 1
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def json_stream(selection):
+    """
+    JSON array of one object per row.
+    """
+    separator = "[\n"
+    for chunk in chunks(selection):
+        text = []
+        for row in chunk:
+            record = {
+                name: None if missing(v) else v
+                for name, v in zip(selection.columns, row)
+            }
+            text.append(separator + json.dumps(record))
+            separator = ",\n"
+        yield "".join(text).encode()
+    yield ("[\n]\n" if separator == "[\n" else "\n]\n").encode()
+
+
+def write_parquet(selection, path):
+    """
+    Writes the export as Parquet, one row group per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {name: pa.float64() for name in selection.measures + ["weight"]}
+    schema = pa.schema(
+        [(name, types.get(name, pa.string())) for name in selection.columns]
+    )
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks(selection):
+            columns = list(zip(*chunk))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(values, type=field.type)
+                        for values, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+
+
+def tee(stream, path):
+    """
+    Passes a stream through while writing it to path, which only appears
+    once the stream has been read to the end.
+    """
+    with atomic_path(path) as temporary:
+        with open(temporary, "wb") as f:
+            for data in stream:
+                f.write(data)
+                yield data
+    prune(EXPORT_DIR, EXPORT_DIR_MAX_BYTES)
+
+
+def download():
+    """
+    Streams or sends the export chosen by the query parameters.
+    """
+    selection = Selection(flask.request.args)
+    key = selection.key()
+    path = os.path.join(EXPORT_DIR, key + "." + selection.format)
+    name = EXPORT_NAME + "." + selection.format
+    mimetype = FORMATS[selection.format]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    try:
+        # Marks the export as recently served, for prune()
+        os.utime(path)
+    except OSError:
+        if selection.format == "parquet":
+            if not has_pyarrow():
+                flask.abort(501, "Parquet export needs the pyarrow package")
+            with atomic_path(path) as temporary:
+                write_parquet(selection, temporary)
+            prune(EXPORT_DIR, EXPORT_DIR_MAX_BYTES)
+        else:
+            stream = (csv_stream if selection.format == "csv" else json_stream)(
+                selection
+            )
+            response = flask.Response(
+                flask.stream_with_context(tee(stream, path)), mimetype=mimetype
+            )
+            response.headers["Content-Disposition"] = "attachment; filename=" + name
+            response.set_etag(key)
+            return response
+
+    return flask.send_file(
+        path, mimetype=mimetype, as_attachment=True, download_name=name, etag=key
+    )
+
+
+def init_app(app):
+    """
+    Registers the download route on the Dash app's server.
+    """
+    app.server.add_url_rule(
+        app.config.requests_pathname_prefix + "download", "download", download
+    )
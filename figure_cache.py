@@ -0,0 +1,233 @@
+"""
+Figure cache for the dashboard callbacks.
+
+Every callback input comes from a small, fixed set of values, so each figure
+is built once per input combination and its serialized form is reused for
+every later request. The tab and dropdown driven sections are enumerated up
+front by warm(); the country comparison and the policy calculator are
+memoized lazily in bounded LRUs.
+
+Caches belong to a dataset. A new dataset is warmed before it is swapped in,
+and the caches of the previous one are dropped with it.
+
+If SNAPSHOT_DIR points at an export written by snapshot.py for the served
+data, figures are read from it instead of being built. Otherwise a miss
+reads through the figure store shared by the server processes, and a
+figure built here is added to it (see figure_store.py).
+"""
+
+import collections
+import os
+import threading
+import weakref
+
+import datasource
+import figure_store
+import metrics
+import snapshot
+from figures import ALTERNATIVE_TABS, ALTERNATIVES, BAR_TABS, FINANCING_RATES, render
+
+COUNTRY_CACHE_SIZE = int(os.environ.get("COUNTRY_CACHE_SIZE", 1024))
+CALCULATOR_CACHE_SIZE = int(os.environ.get("CALCULATOR_FIGURE_CACHE_SIZE", 1024))
+
+SECTIONS = {
+    "bar": None,
+    "country": COUNTRY_CACHE_SIZE,
+    "financing": None,
+    "alternative": None,
+    "calculator": CALCULATOR_CACHE_SIZE,
+}
+
+SNAPSHOT = snapshot.load(os.environ.get("SNAPSHOT_DIR"))
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used mapping with an optional size bound.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """
+        Cached value of key, calling build() to create it on a miss.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        value = build()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if self.maxsize is not None and len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def caches(dataset):
+    """
+    Section caches of a dataset.
+    """
+    with _caches_lock:
+        if dataset not in _caches:
+            _caches[dataset] = {
+                section: LRUCache(maxsize) for section, maxsize in SECTIONS.items()
+            }
+        return _caches[dataset]
+
+
+def build(section, inputs, dataset):
+    """
+    Serialized figure for a section, from the snapshot or the shared figure
+    store when available.
+    """
+    if SNAPSHOT is not None and SNAPSHOT.manifest["data"] == dataset.version:
+        figure = SNAPSHOT.figure(section, inputs)
+        if figure is not None:
+            return figure
+    store = figure_store.STORE
+    if store is not None:
+        figure = store.get(section, inputs, dataset.version)
+        if figure is not None:
+            return figure
+    figure = render(section, inputs, dataset)
+    if store is not None:
+        store.put(section, inputs, dataset.version, figure)
+    return figure
+
+
+def figure(section, inputs, dataset=None):
+    """
+    Cached serialized figure for a section and its callback inputs.
+    """
+    dataset = dataset or datasource.active()
+    with metrics.phase("figure"):
+        return caches(dataset)[section].get(
+            inputs, lambda: build(section, inputs, dataset)
+        )
+
+
+def bar_figure(bar_figure_tabs, dataset=None):
+    """
+    Serialized section one figure for a tab value.
+    """
+    return figure("bar", (bar_figure_tabs,), dataset)
+
+
+def country_figure(country_drop_rate, country1, country2, dataset=None, peers=()):
+    """
+    Serialized section two figure for a measure and a pair of countries, and
+    any further countries or peer groups.
+    """
+    return figure("country", (country_drop_rate, country1, country2, *peers), dataset)
+
+
+def financing_figure(financing_drop_rate, dataset=None):
+    """
+    Serialized section three figure for a dropdown value.
+    """
+    return figure("financing", (financing_drop_rate,), dataset)
+
+
+def alternative_figure(alternative_radio_value, alternative_figure_tabs, dataset=None):
+    """
+    Serialized section four figure for a policy and tab value.
+    """
+    if alternative_radio_value not in ALTERNATIVES:
+        raise KeyError(alternative_radio_value)
+    return figure(
+        "alternative", (alternative_radio_value, alternative_figure_tabs), dataset
+    )
+
+
+def calculator_figure(calculator_drop_rate, policy, dataset=None):
+    """
+    Serialized section five figure for a measure and a policy scenario.
+    """
+    return figure("calculator", (calculator_drop_rate, *policy), dataset)
+
+
+@datasource.on_load
+def warm(dataset=None):
+    """
+    Builds every figure of the fixed-domain sections, and loads the most
+    recently used figures of the others from the shared figure store.
+    """
+    dataset = dataset or datasource.active()
+    for tab in BAR_TABS:
+        bar_figure(tab, dataset)
+    for rate in FINANCING_RATES:
+        financing_figure(rate, dataset)
+    for alternative in ALTERNATIVES:
+        for tab in ALTERNATIVE_TABS:
+            alternative_figure(alternative, tab, dataset)
+    if figure_store.STORE is not None:
+        for section, maxsize in SECTIONS.items():
+            if maxsize is None:
+                continue
+            cache = caches(dataset)[section]
+            for inputs, figure in figure_store.STORE.recent(
+                section, dataset.version, maxsize
+            ):
+                cache.put(inputs, figure)
+
+
+def clear(dataset=None):
+    """
+    Drops every cached figure of a dataset.
+    """
+    with _caches_lock:
+        _caches.pop(dataset or datasource.active(), None)
+
+
+def info(dataset=None):
+    """
+    Hit, miss and size counters for each cached section.
+    """
+    return {
+        section: cache.info()
+        for section, cache in caches(dataset or datasource.active()).items()
+    }
+
+
+@metrics.collector
+def cache_metrics():
+    """
+    Counters of the active dataset's figure caches, in the metrics text format.
+    """
+    sections = info()
+    yield "# HELP figure_cache_requests_total Figure cache lookups by result."
+    yield "# TYPE figure_cache_requests_total counter"
+    for section, cache in sections.items():
+        yield 'figure_cache_requests_total{{section="{}",result="hit"}} {}'.format(
+            section, cache.hits
+        )
+        yield 'figure_cache_requests_total{{section="{}",result="miss"}} {}'.format(
+            section, cache.misses
+        )
+    yield "# HELP figure_cache_entries Figures held in the cache."
+    yield "# TYPE figure_cache_entries gauge"
+    for section, cache in sections.items():
+        yield 'figure_cache_entries{{section="{}"}} {}'.format(section, cache.currsize)
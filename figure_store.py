@@ -0,0 +1,272 @@
+"""
+Figure store shared by the server processes.
+
+Under gunicorn each worker has its own figure cache, so a figure built by
+one worker would be built again by every other. On a miss the figure cache
+reads through this store instead: a SQLite database at FIGURE_STORE holding
+serialized figures keyed by section, callback inputs, data version and a
+digest of the code that builds figures (figures.code_version), so figures
+of other data or of an older deploy are never served. Setting FIGURE_STORE
+to an empty string disables it.
+
+The store holds at most FIGURE_STORE_MB of figures and drops the least
+recently used first, with the stored bytes kept as a running total by
+triggers. When the data of the default vintage changes, the figures of its
+old version are deleted; at startup, those built by other code are. The
+most recently used figures of the lazily memoized sections warm each new
+process's cache.
+
+Database errors are logged and count as misses, so the dashboard carries on
+building figures itself.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import plotly.io as pio
+
+import datasource
+import figures
+import metrics
+
+FIGURE_STORE = os.environ.get(
+    "FIGURE_STORE",
+    os.path.join(tempfile.gettempdir(), "oecd-tax-burden-figures.sqlite"),
+)
+FIGURE_STORE_MAX_BYTES = float(os.environ.get("FIGURE_STORE_MB", 256)) * 2**20
+
+# Share of the size bound kept by an eviction, so that evictions are rare
+EVICT_TO = 0.9
+
+SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS figures (
+    section TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    version TEXT NOT NULL,
+    code TEXT NOT NULL,
+    figure BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (section, inputs, version, code)
+);
+CREATE INDEX IF NOT EXISTS figures_used ON figures (used);
+CREATE TABLE IF NOT EXISTS total (bytes INTEGER NOT NULL);
+INSERT INTO total SELECT TOTAL(size) FROM figures
+    WHERE NOT EXISTS (SELECT 1 FROM total);
+CREATE TRIGGER IF NOT EXISTS figures_insert AFTER INSERT ON figures BEGIN
+    UPDATE total SET bytes = bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS figures_delete AFTER DELETE ON figures BEGIN
+    UPDATE total SET bytes = bytes - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS figures_update AFTER UPDATE OF size ON figures BEGIN
+    UPDATE total SET bytes = bytes + new.size - old.size;
+END;
+COMMIT;
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class FigureStore:
+    """
+    Serialized figures in a SQLite database shared by processes.
+    """
+
+    def __init__(self, path, max_bytes=FIGURE_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.code = figures.code_version()
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.create()
+
+    def connection(self):
+        """
+        Connection of this thread, opened anew in a forked process.
+        """
+        local = self.local
+        if getattr(local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            local.db.execute("PRAGMA journal_mode=WAL")
+            local.db.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.db
+
+    def create(self):
+        """
+        Creates the tables and triggers, in one transaction.
+        """
+        db = self.connection()
+        try:
+            db.executescript(SCHEMA)
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.rollback()
+            self.errors += 1
+            logger.warning("Figure store creation failed", exc_info=True)
+
+    def execute(self, sql, parameters=()):
+        """
+        Runs a statement, returning its cursor, or None after logging a
+        database error.
+        """
+        try:
+            return self.connection().execute(sql, parameters)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.warning("Figure store query failed", exc_info=True)
+            return None
+
+    def key(self, section, inputs, version):
+        return (section, json.dumps(list(inputs)), version, self.code)
+
+    def get(self, section, inputs, version):
+        """
+        Figure of a section's inputs on a data version, or None.
+        """
+        key = self.key(section, inputs, version)
+        cursor = self.execute(
+            "SELECT figure FROM figures "
+            "WHERE section = ? AND inputs = ? AND version = ? AND code = ?",
+            key,
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.execute(
+            "UPDATE figures SET used = ? "
+            "WHERE section = ? AND inputs = ? AND version = ? AND code = ?",
+            (time.time(), *key),
+        )
+        return json.loads(row[0])
+
+    def put(self, section, inputs, version, figure):
+        """
+        Stores a figure, evicting the least recently used beyond the bound.
+        """
+        data = pio.to_json(figure, validate=False).encode()
+        self.execute(
+            "INSERT INTO figures "
+            "(section, inputs, version, code, figure, size, used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (section, inputs, version, code) DO UPDATE SET "
+            "figure = excluded.figure, size = excluded.size, used = excluded.used",
+            (*self.key(section, inputs, version), data, len(data), time.time()),
+        )
+        cursor = self.execute("SELECT bytes FROM total")
+        if cursor is not None and cursor.fetchone()[0] > self.max_bytes:
+            self.evict(self.max_bytes * EVICT_TO)
+
+    def evict(self, keep_bytes):
+        """
+        Deletes the least recently used figures beyond keep_bytes.
+        """
+        self.execute(
+            "DELETE FROM figures WHERE rowid IN ("
+            "SELECT rowid FROM (SELECT rowid, "
+            "SUM(size) OVER (ORDER BY used DESC, rowid) AS kept FROM figures) "
+            "WHERE kept > ?)",
+            (keep_bytes,),
+        )
+
+    def recent(self, section, version, limit=None):
+        """
+        (inputs, figure) of the most recently used figures of a section on
+        a data version, least recent first.
+        """
+        cursor = self.execute(
+            "SELECT inputs, figure FROM figures "
+            "WHERE section = ? AND version = ? AND code = ? "
+            "ORDER BY used DESC LIMIT ?",
+            (section, version, self.code, -1 if limit is None else limit),
+        )
+        rows = cursor.fetchall() if cursor is not None else []
+        return [
+            (tuple(json.loads(inputs)), json.loads(figure))
+            for inputs, figure in reversed(rows)
+        ]
+
+    def invalidate(self, version):
+        """
+        Deletes the figures of a data version.
+        """
+        self.execute("DELETE FROM figures WHERE version = ?", (version,))
+
+    def prune(self):
+        """
+        Deletes the figures built by other code.
+        """
+        self.execute("DELETE FROM figures WHERE code != ?", (self.code,))
+
+    def info(self):
+        """
+        Lookup counters and the number and bytes of stored figures.
+        """
+        cursor = self.execute("SELECT (SELECT COUNT(*) FROM figures), bytes FROM total")
+        entries, size = cursor.fetchone() if cursor is not None else (0, 0)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "entries": entries,
+            "bytes": int(size),
+        }
+
+
+def load(path):
+    """
+    Opens the store at path and prunes it, or None if disabled.
+    """
+    if not path:
+        return None
+    store = FigureStore(path)
+    store.prune()
+    return store
+
+
+STORE = load(FIGURE_STORE)
+
+
+@datasource.on_load
+def invalidate(dataset):
+    """
+    Deletes the figures of the default dataset a new one replaces.
+    """
+    previous = datasource.active()
+    if STORE is not None and previous.version != dataset.version:
+        STORE.invalidate(previous.version)
+
+
+@metrics.collector
+def store_metrics():
+    """
+    Counters of the shared figure store, in the metrics text format.
+    """
+    if STORE is None:
+        return
+    info = STORE.info()
+    yield "# HELP figure_store_requests_total Shared figure store lookups by result."
+    yield "# TYPE figure_store_requests_total counter"
+    yield 'figure_store_requests_total{{result="hit"}} {}'.format(info["hits"])
+    yield 'figure_store_requests_total{{result="miss"}} {}'.format(info["misses"])
+    yield "# HELP figure_store_errors_total Failed shared figure store queries."
+    yield "# TYPE figure_store_errors_total counter"
+    yield "figure_store_errors_total {}".format(info["errors"])
+    yield "# HELP figure_store_entries Figures held in the shared store."
+    yield "# TYPE figure_store_entries gauge"
+    yield "figure_store_entries {}".format(info["entries"])
+    yield "# HELP figure_store_bytes Bytes of figures held in the shared store."
+    yield "# TYPE figure_store_bytes gauge"
+    yield "figure_store_bytes {}".format(info["bytes"])
@@ -0,0 +1,442 @@
+"""
+Figure builders for the OECD Corporate Tax Burden dashboard.
+
+Each builder takes the data vintage to show (the default one if None) and
+reads its dataset once, or uses the dataset it is given, so a figure is
+always built from a single data version.
+"""
+
+import hashlib
+import math
+import os
+import plotly
+import plotly.io as pio
+import plotly.graph_objects as go
+
+import datasource
+from asset_cube import ASSETS
+from calculator import CURRENT_LAW, Policy, calculate
+from charts import Average, Bars, ChartSpec, PolicyMarkers, Points, emit, template
+from scenarios import HOVER_LABELS
+from store import OECD
+
+pio.templates.default = "plotly_white"
+
+APP_PATH = os.path.abspath(os.path.dirname(__file__))
+
+# Modules render() builds figures with, directly or through the dataset
+FIGURE_MODULES = [
+    "asset_cube",
+    "calculator",
+    "charts",
+    "countries",
+    "datasource",
+    "figures",
+    "groups",
+    "rankings",
+    "scenarios",
+    "solver",
+    "store",
+]
+
+# Marker colors of the countries compared in section two, in order
+COMPARISON_COLORS = [
+    "#008CCC",
+    "#FFB400",
+    "#00D56F",
+    "#FF8100",
+    "#8E919A",
+    "#FB0023",
+    "#67C5F0",
+    "#FF5C68",
+]
+
+
+def make_bar_figure(
+    rate, ratetitle, ratelabel, stat_marker, vintage=None, dataset=None
+):
+    """
+    Function creates bar chart for section one, as a figure dict.
+    """
+    traces = [Bars(ratelabel, "#008CCC")]
+    if stat_marker:
+        traces.append(Points("statutory_tax_rate", "Statutory Rate", "#67C5F0", {}))
+    traces.append(Average(ratelabel, ratelabel, "#FF5C68"))
+
+    layout = dict(
+        showlegend=False,
+        title=dict(
+            text=ratetitle
+            + " in the OECD, Current Law and Proposals "
+            + "<br><sup><i>Hover over data to view more information.</i></sup>"
+        ),
+        yaxis=dict(
+            gridcolor="#F2F2F2",
+            tickformat=".1%",
+        ),
+        paper_bgcolor="#FFFFFF",
+        plot_bgcolor="#FFFFFF",
+    )
+
+    return emit(
+        ChartSpec(rate, None, traces, layout), dataset or datasource.get(vintage)
+    )
+
+
+def make_country_figure(
+    country1, country2, measure, measurename, measuretitle, vintage=None, dataset=None
+):
+    """
+    Function creates scatter chart for section two.
+    """
+    return make_comparison_figure(
+        [country1, country2],
+        measure,
+        measurename,
+        measuretitle,
+        vintage=vintage,
+        dataset=dataset,
+    )
+
+
+def make_comparison_figure(
+    countries, measure, measurename, measuretitle, vintage=None, dataset=None
+):
+    """
+    Function creates scatter chart of any number of countries for section two.
+    Peer group ids among the countries are shown as the group's weighted mean,
+    with error bars of one weighted standard deviation.
+    """
+    dataset = dataset or datasource.get(vintage)
+    groups = dataset.groups
+    codes = [code for code in countries if code not in groups]
+    country_names, country_values = dataset.assets.compare(codes, measure)
+    variables = list(ASSETS.values())
+
+    traces = []
+    names = []
+    row = 0
+    for i, code in enumerate(countries):
+        color = COMPARISON_COLORS[i % len(COMPARISON_COLORS)]
+        if code in groups:
+            means, stds = groups.assets(code, measure)
+            names.append(groups.get(code).label)
+            traces.append(
+                go.Scatter(
+                    x=means,
+                    y=variables,
+                    error_x=dict(type="data", array=stds, color=color),
+                    marker=dict(size=20, color=color),
+                    mode="markers",
+                    name=names[-1] + " (weighted mean)",
+                    marker_symbol="diamond",
+                )
+            )
+            continue
+        names.append(country_names[row])
+        traces.append(
+            go.Scatter(
+                x=country_values[row],
+                y=variables,
+                marker=dict(
+                    size=20,
+                    color=color,
+                ),
+                mode="markers",
+                name=names[-1],
+                marker_symbol="circle",
+            )
+        )
+        row += 1
+
+    layout = go.Layout(
+        title="<i>"
+        + " vs. ".join(names)
+        + ",</i>"
+        + " "
+        + measuretitle
+        + " by Asset and Form of Financing"
+        + "<br><sup><i>Hover over data to view more information. Toggle legend items to show or hide elements.</i></sup>",
+        xaxis=dict(
+            tickformat=".1%",
+            gridcolor="#F2F2F2",
+            zeroline=False,
+        ),
+        yaxis=dict(gridcolor="#8E919A", linecolor="#F2F2F2", type="category"),
+        paper_bgcolor="#F2F2F2",
+        plot_bgcolor="#F2F2F2",
+        height=400,
+    )
+
+    return go.Figure(data=traces, layout=layout)
+
+
+def make_financing_figure(
+    rate, ratetitle, ratelabel_bar, ratelabel_point, vintage=None, dataset=None
+):
+    """
+    Function creates bar chart for section three, as a figure dict.
+    """
+    traces = [
+        Points(
+            rate + "_equity_overall",
+            ratelabel_point + " on Equity <br>Financed Investment",
+            "#8E919A",
+            dict(symbol="circle", size=8, line=dict(color="#8E919A", width=2)),
+        ),
+        Points(
+            rate + "_debt_overall",
+            ratelabel_point + " on Debt <br>Financed Investment",
+            "#8E919A",
+            dict(symbol="square-open", size=8, line=dict(width=2)),
+        ),
+        Bars(ratelabel_bar, "#008CCC"),
+        Average("OECD Average<br>" + ratelabel_bar, ratelabel_bar, "#FB0023"),
+    ]
+
+    layout = dict(
+        title=dict(
+            text=ratelabel_bar
+            + ", Measured by "
+            + ratetitle
+            + " in the OECD, Current Law and Proposals"
+            + "<br><sup><i>Hover over data to view more information. Toggle legend items to show or hide elements.</i></sup>"
+        ),
+        yaxis=dict(
+            gridcolor="#F2F2F2",
+            tickformat=".1%",
+            zerolinecolor="#F2F2F2",
+        ),
+        paper_bgcolor="#FFFFFF",
+        plot_bgcolor="#FFFFFF",
+        height=600,
+    )
+
+    return emit(
+        ChartSpec(rate + "_debt_bias", None, traces, layout),
+        dataset or datasource.get(vintage),
+    )
+
+
+def make_alternative_figure(
+    rate, ratetitle, ratelabel, alternative, axisrange, vintage=None, dataset=None
+):
+    """
+    Function creates bar chart for section four, as a figure dict. The
+    policy markers are left out when the data lacks the alternative policy.
+    """
+    dataset = dataset or datasource.get(vintage)
+    traces = [
+        Bars(ratelabel, "#008CCC"),
+        Average(ratelabel, ratelabel, "#FF5C68"),
+    ]
+    if alternative != "CL" and alternative in dataset.ranks.scenario_table.scenarios:
+        traces.append(
+            PolicyMarkers(
+                "Alternative Policy",
+                "<b>This Estimate Includes:</b><br>" + HOVER_LABELS[alternative],
+            )
+        )
+
+    layout = dict(
+        showlegend=False,
+        title=dict(
+            text=ratetitle
+            + " in the OECD, Current Law, Proposals, and Alternative Policies"
+            + "<br><sup><i>Hover over data to view more information.</i></sup>"
+        ),
+        yaxis=dict(
+            gridcolor="#8E919A",
+            zerolinecolor="#8E919A",
+            tickformat=".1%",
+            range=axisrange,
+        ),
+        paper_bgcolor="#F2F2F2",
+        plot_bgcolor="#F2F2F2",
+        height=500,
+    )
+
+    return emit(ChartSpec(rate, alternative, traces, layout), dataset)
+
+
+def make_calculator_figure(
+    policy, measure, measurename, measuretitle, vintage=None, dataset=None
+):
+    """
+    Function creates scatter chart of calculated US rates for section five,
+    as a figure dict. Undefined rates are left out with a note.
+    """
+    dataset = dataset or datasource.get(vintage)
+    store = dataset.store
+    columns = ["overall", "equity_overall", "debt_overall"] + list(ASSETS)
+    variables = ["Overall", "Equity Financed", "Debt Financed"] + list(ASSETS.values())
+    oecd = store.row(OECD)
+
+    def us(policy):
+        # The calculator's change from current law on the data's US estimates,
+        # as the rank solver and the sweep project it
+        rates = calculate(policy)
+        return [
+            float(dataset.solver.project(measure + "_" + c, rates[measure + "_" + c]))
+            for c in columns
+        ]
+
+    series = [
+        (
+            "OECD Average",
+            "#8E919A",
+            [float(store.column(measure + "_" + c)[oecd]) for c in columns],
+        ),
+        ("US Current Law", "#00D56F", us(CURRENT_LAW)),
+        ("US Policy Scenario", "#008CCC", us(policy)),
+    ]
+    series = [
+        (name, color, [None if math.isnan(v) else v for v in values])
+        for name, color, values in series
+    ]
+    undefined = any(v is None for _, _, values in series for v in values)
+
+    data = [
+        {
+            "marker": {"color": color, "size": 20, "symbol": "circle"},
+            "mode": "markers",
+            "name": name,
+            "x": values,
+            "y": variables,
+            "type": "scatter",
+        }
+        for name, color, values in series
+    ]
+
+    layout = dict(
+        title=dict(
+            text="<i>US Policy Scenario,</i> "
+            + measuretitle
+            + " by Asset and Form of Financing"
+            + "<br><sup><i>Hover over data to view more information. Toggle legend items to show or hide elements.</i></sup>"
+        ),
+        xaxis=dict(
+            tickformat=".1%",
+            gridcolor="#F2F2F2",
+            zeroline=False,
+        ),
+        yaxis=dict(gridcolor="#8E919A", linecolor="#F2F2F2", type="category"),
+        paper_bgcolor="#F2F2F2",
+        plot_bgcolor="#F2F2F2",
+        height=450,
+        template=template(),
+    )
+    if undefined:
+        layout["annotations"] = [
+            dict(
+                text="<i>Rates are left out where the cost of capital is "
+                "near zero and the METR is undefined.</i>",
+                showarrow=False,
+                xref="paper",
+                yref="paper",
+                x=0,
+                y=-0.15,
+            )
+        ]
+
+    return {"data": data, "layout": layout}
+
+
+# Callback Inputs
+BAR_TABS = {
+    "stat_tab": (
+        "statutory_tax_rate",
+        "Statutory Corporate Tax Rates",
+        "Statutory Rate",
+        False,
+    ),
+    "metr_tab": (
+        "metr_overall",
+        "Marginal Effective Corporate Tax Rates (METRs)",
+        "METR",
+        True,
+    ),
+    "aetr_tab": (
+        "aetr_overall",
+        "Average Effective Corporate Tax Rates (AETRs)",
+        "AETR",
+        True,
+    ),
+}
+
+COUNTRY_RATES = {
+    "metr": ("METR", "METRs"),
+    "aetr": ("AETR", "AETRs"),
+}
+
+FINANCING_RATES = {
+    "metr": ("METRs", "Debt-Equity Bias", "METR"),
+    "aetr": ("AETRs", "Debt-Equity Bias", "AETR"),
+}
+
+ALTERNATIVE_TABS = {
+    "metr_tab": ("metr_overall", "METRs", "METR", [-0.20, 0.20]),
+    "aetr_tab": ("aetr_overall", "AETRs", "AETR", [0.00, 0.31]),
+}
+
+ALTERNATIVES = ["CL", "BONUS", "RND", "EBITDA", "FDII"]
+
+
+def states(dataset=None):
+    """
+    Yields (section, inputs) for every reachable figure state.
+    """
+    dataset = dataset or datasource.active()
+    countries = dataset.store.column("country", "comparable")
+    for tab in BAR_TABS:
+        yield "bar", (tab,)
+    for rate in COUNTRY_RATES:
+        for country1 in countries:
+            for country2 in countries:
+                yield "country", (rate, country1, country2)
+    for rate in FINANCING_RATES:
+        yield "financing", (rate,)
+    for alternative in ALTERNATIVES:
+        for tab in ALTERNATIVE_TABS:
+            yield "alternative", (alternative, tab)
+
+
+def code_version():
+    """
+    Digest of the source of FIGURE_MODULES and of the plotly version,
+    identifying the figures this code renders.
+    """
+    digest = hashlib.sha256(plotly.__version__.encode())
+    for name in FIGURE_MODULES:
+        with open(os.path.join(APP_PATH, name + ".py"), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def render(section, inputs, dataset=None):
+    """
+    Builds the figure dict for a section and its callback inputs.
+    """
+    if section == "bar":
+        (tab,) = inputs
+        return make_bar_figure(*BAR_TABS[tab], dataset=dataset)
+    if section == "country":
+        rate, *countries = inputs
+        return make_comparison_figure(
+            countries, rate, *COUNTRY_RATES[rate], dataset=dataset
+        ).to_plotly_json()
+    if section == "calculator":
+        rate, *params = inputs
+        return make_calculator_figure(
+            Policy(*map(float, params)), rate, *COUNTRY_RATES[rate], dataset=dataset
+        )
+    if section == "financing":
+        (rate,) = inputs
+        return make_financing_figure(rate, *FINANCING_RATES[rate], dataset=dataset)
+    if section == "alternative":
+        alternative, tab = inputs
+        rate, ratetitle, ratelabel, axisrange = ALTERNATIVE_TABS[tab]
+        return make_alternative_figure(
+            rate, ratetitle, ratelabel, alternative, axisrange, dataset=dataset
+        )
+    raise KeyError(section)
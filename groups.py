@@ -0,0 +1,198 @@
+"""
+Peer groups of jurisdictions and their aggregate rates.
+
+A group is a named set of country codes. The built-in groups below can be
+extended with register(), or from a JSON file named by PEER_GROUPS_FILE
+mapping each group id to {"label": ..., "members": [...]}.
+
+GroupStats computes the weighted mean and weighted standard deviation of
+every rate column over each registered group at once, as a product of a
+group by jurisdiction weight matrix with the rate columns. Statistics of
+other sets of countries are computed the same way on first use and
+memoized. Weights come from the weight column, normalized within each
+group; a group whose members all have zero weight is averaged unweighted.
+"""
+
+import collections
+import json
+import os
+import threading
+
+import numpy as np
+
+from asset_cube import ASSETS
+
+PEER_GROUPS_FILE = os.environ.get("PEER_GROUPS_FILE")
+GROUP_CACHE_SIZE = int(os.environ.get("GROUP_CACHE_SIZE", 256))
+
+Group = collections.namedtuple("Group", ["label", "members"])
+
+GROUPS = {
+    "EU": Group(
+        "European Union",
+        [
+            "AUT",
+            "BEL",
+            "CZE",
+            "DEU",
+            "DNK",
+            "ESP",
+            "EST",
+            "FIN",
+            "FRA",
+            "GRC",
+            "HUN",
+            "IRL",
+            "ITA",
+            "LTU",
+            "LUX",
+            "LVA",
+            "NLD",
+            "POL",
+            "PRT",
+            "SVK",
+            "SVN",
+            "SWE",
+        ],
+    ),
+    "G7": Group("G7", ["CAN", "DEU", "FRA", "GBR", "ITA", "JPN", "USA"]),
+    "NORDICS": Group("Nordic Countries", ["DNK", "FIN", "ISL", "NOR", "SWE"]),
+}
+
+GroupStat = collections.namedtuple("GroupStat", ["label", "members", "mean", "std"])
+
+
+def register(group_id, label, members):
+    """
+    Adds or replaces a peer group.
+    """
+    GROUPS[group_id] = Group(label, list(members))
+
+
+def load(path):
+    """
+    Registers the peer groups of a JSON file.
+    """
+    with open(path) as f:
+        for group_id, group in json.load(f).items():
+            register(group_id, group["label"], group["members"])
+
+
+if PEER_GROUPS_FILE:
+    load(PEER_GROUPS_FILE)
+
+
+class GroupStats:
+    """
+    Weighted means and dispersion of every rate column over peer groups of
+    one data store's jurisdictions.
+    """
+
+    def __init__(self, store, groups=None):
+        self.measures = store.measures
+        self.column = {measure: i for i, measure in enumerate(self.measures)}
+        codes = store.column("country", "members").tolist()
+        self.index = {code: i for i, code in enumerate(codes)}
+        self.weights = np.asarray(store.column("weight", "members"), dtype=float)
+        self.values = np.column_stack(
+            [store.column(measure, "members") for measure in self.measures]
+        )
+        # Groups with members in the data, under ids that are not country codes
+        self.groups = {}
+        for group_id, group in (GROUPS if groups is None else groups).items():
+            rows = self.members(group.members)
+            if rows and group_id not in self.index:
+                self.groups[group_id] = (group.label, rows)
+        self.search_text = {
+            group_id: (group_id + " " + label).lower()
+            for group_id, (label, _) in self.groups.items()
+        }
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        means, stds = self.aggregate([rows for _, rows in self.groups.values()])
+        self.stats = {
+            group_id: GroupStat(label, rows, means[i], stds[i])
+            for i, (group_id, (label, rows)) in enumerate(self.groups.items())
+        }
+
+    def members(self, codes):
+        """
+        Rows of the codes present in the data.
+        """
+        return [self.index[code] for code in codes if code in self.index]
+
+    def aggregate(self, groups):
+        """
+        Weighted means and standard deviations of every column for lists of
+        rows, one row of each per group.
+        """
+        matrix = np.zeros((len(groups), len(self.weights)))
+        for i, rows in enumerate(groups):
+            if not len(rows):
+                continue
+            weights = self.weights[rows]
+            if not weights.sum():
+                weights = np.ones(len(rows))
+            matrix[i, rows] = weights / weights.sum()
+        means = matrix @ self.values
+        variances = matrix @ self.values**2 - means**2
+        return means, np.sqrt(np.maximum(variances, 0))
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __contains__(self, group_id):
+        return group_id in self.groups
+
+    def options(self, selected=(), query=""):
+        """
+        Dropdown options of the groups matching a query, and the selected ones.
+        """
+        query = (query or "").strip().lower()
+        return [
+            {"label": label + " (group)", "value": group_id}
+            for group_id, (label, _) in self.groups.items()
+            if query in self.search_text[group_id] or group_id in selected
+        ]
+
+    def get(self, group):
+        """
+        Statistics of a registered group id, or of an iterable of country codes.
+        """
+        if isinstance(group, str):
+            return self.stats[group]
+        key = frozenset(group)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        rows = self.members(sorted(key))
+        means, stds = self.aggregate([rows])
+        stat = GroupStat(", ".join(sorted(key)), rows, means[0], stds[0])
+        with self.lock:
+            self.cache[key] = stat
+            if len(self.cache) > GROUP_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return stat
+
+    def columns(self, group, columns):
+        """
+        Means and standard deviations of some columns over a group.
+        """
+        stat = self.get(group)
+        index = [self.column[column] for column in columns]
+        return stat.mean[index], stat.std[index]
+
+    def assets(self, group, measure):
+        """
+        Means and standard deviations of a measure by asset class over a group,
+        in the order of asset_cube.ASSETS.
+        """
+        return self.columns(group, [measure + "_" + asset for asset in ASSETS])
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + sum(
+            stat.mean.nbytes + stat.std.nbytes for stat in self.stats.values()
+        )
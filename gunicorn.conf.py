@@ -0,0 +1,20 @@
+"""
+Gunicorn settings, read automatically when gunicorn is started from the
+repository root (as by the Procfile).
+"""
+
+import gc
+
+# Import the app once in the master process, so the workers share its data,
+# indexes and warmed figure cache copy-on-write instead of each building them.
+preload_app = True
+
+
+def when_ready(server):
+    import app
+
+    # Build and serialize the page layout before forking as well
+    app.app.serve_layout()
+    # Move everything allocated so far out of the garbage collector's reach,
+    # so collections in the workers do not touch, and so copy, those pages
+    gc.freeze()
@@ -0,0 +1,562 @@
+"""
+Background jobs for long computations: policy sweeps, data exports and
+image exports.
+
+POST /jobs/<kind> with a JSON object of parameters queues a job and returns
+at once with its status; GET /jobs/<id> reports its progress and GET
+/jobs/<id>/result sends its file once it is done. The kinds and their
+parameters are:
+
+    sweep    values    values of each policy parameter, a start:stop:step
+                       range or a list, as taken by sweep.py
+             measures  rates to compute and rank (default metr_overall and
+                       aetr_overall)
+             format    parquet (default) or csv
+             vintage   data vintage (default vintage otherwise)
+    export   the query parameters of /download, e.g. {"vintages": "all",
+             "sections": "all", "format": "parquet"}
+    images   formats   image formats (default png)
+             sections  sections to render (default all)
+             width, height, scale
+
+Jobs are recorded in the SQLite database JOB_DB, so every server process
+sees every job, and their files are written to JOB_DIR. A job is identified
+by a digest of its kind, parameters and data version: submitting the same
+job again returns the existing one rather than running it twice, unless it
+failed or its file is gone. Each server process runs the jobs it queued in
+a pool of JOB_WORKERS threads, so they outlive the request that submitted
+them; the computation of sweeps and images is itself spread over processes.
+A job left behind by a process that died is queued again by the next process
+that reads it.
+
+The files of finished jobs take at most JOB_DIR_MB, and the least recently
+used jobs are deleted beyond it. Failed jobs are deleted after JOB_MAX_AGE
+seconds.
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import flask
+from werkzeug.exceptions import HTTPException
+
+import calculator
+import datasource
+import exports
+import renderer
+import renders
+import sweep
+import util
+
+logger = logging.getLogger(__name__)
+
+JOB_DIR = os.environ.get(
+    "JOB_DIR", os.path.join(tempfile.gettempdir(), "oecd-tax-burden-jobs")
+)
+JOB_DB = os.environ.get("JOB_DB", os.path.join(JOB_DIR, "jobs.sqlite"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+JOB_MAX_SWEEP_POINTS = int(os.environ.get("JOB_MAX_SWEEP_POINTS", 50000000))
+JOB_DIR_MAX_BYTES = float(os.environ.get("JOB_DIR_MB", 2048)) * 2**20
+JOB_MAX_AGE = float(os.environ.get("JOB_MAX_AGE", 86400))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    owner INTEGER,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+PENDING = ["queued", "running"]
+
+Job = collections.namedtuple(
+    "Job", ["id", "kind", "params", "status", "progress", "owner", "result", "error"]
+)
+
+Kind = collections.namedtuple("Kind", ["check", "run"])
+Kind.__doc__ = """
+Functions of a kind of job: check(params) validates the parameters and
+returns them normalized, raising ValueError; run(params, path, progress)
+writes the result to path plus an extension, returns its path and may call
+progress(fraction) as it goes.
+"""
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+blueprint = flask.Blueprint("jobs", __name__)
+blueprint.register_error_handler(HTTPException, util.json_error)
+
+
+@contextlib.contextmanager
+def database():
+    """
+    Connection to the job database, committed and closed after use.
+    """
+    os.makedirs(os.path.dirname(JOB_DB) or ".", exist_ok=True)
+    db = sqlite3.connect(JOB_DB, timeout=30)
+    try:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(SCHEMA)
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+def executor():
+    """
+    Job thread pool of this process.
+    """
+    global _executor, _executor_pid
+    with _lock:
+        if _executor_pid != os.getpid():
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                JOB_WORKERS, thread_name_prefix="job"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def alive(pid):
+    """
+    Whether a process is running on this machine.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def check_vintage(vintage):
+    if vintage and vintage not in datasource.vintages():
+        raise ValueError("Unknown vintage: {}".format(vintage))
+    return vintage or None
+
+
+def check_sweep(params):
+    values = params.get("values") or {}
+    if not isinstance(values, dict):
+        raise ValueError("values must be an object")
+    unknown = set(values) - set(calculator.Policy._fields)
+    if unknown:
+        raise ValueError("unknown parameters: {}".format(", ".join(sorted(unknown))))
+    # Ranges are kept as given and only expanded by the job, after the
+    # number of points is checked
+    specs = {}
+    points = 1
+    for name, value in values.items():
+        try:
+            if isinstance(value, str):
+                count = sweep.grid_count(value)
+                specs[name] = value
+            else:
+                specs[name] = [float(v) for v in value]
+                count = len(specs[name])
+                if not all(math.isfinite(v) for v in specs[name]):
+                    raise ValueError("values must be finite")
+        except (TypeError, ValueError) as e:
+            raise ValueError("invalid values of {}: {}".format(name, e))
+        if count == 0:
+            raise ValueError("no values of {}".format(name))
+        points *= count
+    if points > JOB_MAX_SWEEP_POINTS:
+        raise ValueError("a sweep has at most {} points".format(JOB_MAX_SWEEP_POINTS))
+    measures = params.get("measures") or sweep.DEFAULT_MEASURES
+    for measure in measures:
+        if measure not in calculator.MEASURES:
+            raise ValueError("Unknown measure: {}".format(measure))
+    format = params.get("format", "parquet")
+    if format not in ["parquet", "csv"]:
+        raise ValueError("Unknown format: {}".format(format))
+    if format == "parquet" and not util.has_pyarrow():
+        raise ValueError("writing Parquet needs the pyarrow package; use csv")
+    return {
+        "values": specs,
+        "measures": list(measures),
+        "format": format,
+        "vintage": check_vintage(params.get("vintage")),
+    }
+
+
+def run_sweep(params, path, progress):
+    path = path + "." + params["format"]
+    sweep.sweep(
+        sweep.Grid(
+            {
+                name: sweep.grid_values(value) if isinstance(value, str) else value
+                for name, value in params["values"].items()
+            }
+        ),
+        path,
+        params["measures"],
+        dataset=datasource.get(params["vintage"]),
+        progress=progress,
+    )
+    return path
+
+
+def check_export(params):
+    params = {
+        name: ",".join(value) if isinstance(value, list) else str(value)
+        for name, value in params.items()
+    }
+    try:
+        exports.Selection(params)
+    except HTTPException as e:
+        raise ValueError(e.description)
+    return params
+
+
+def run_export(params, path, progress):
+    selection = exports.Selection(params)
+    path = path + "." + selection.format
+    with util.atomic_path(path) as temporary:
+        if selection.format == "parquet":
+            exports.write_parquet(selection, temporary)
+        else:
+            stream = (
+                exports.csv_stream if selection.format == "csv" else exports.json_stream
+            )
+            with open(temporary, "wb") as f:
+                for data in stream(selection):
+                    f.write(data)
+    return path
+
+
+def check_images(params):
+    if not renders.available():
+        raise ValueError("Rendering images needs the kaleido package")
+    formats = params.get("formats") or ["png"]
+    for format in formats:
+        if format not in renderer.FORMATS:
+            raise ValueError("Unknown format: {}".format(format))
+    sections = params.get("sections")
+    for section in sections or []:
+        if section not in ["bar", "country", "financing", "alternative"]:
+            raise ValueError("Unknown section: {}".format(section))
+    try:
+        width = int(params.get("width", renders.RENDER_WIDTH))
+        height = None if params.get("height") is None else int(params["height"])
+        scale = float(params.get("scale", 1))
+    except (TypeError, ValueError):
+        raise ValueError("width, height and scale must be numbers")
+    for name, value in [("width", width), ("height", height)]:
+        if value is not None and not 0 < value <= renders.RENDER_MAX_PIXELS:
+            raise ValueError(
+                "{} must be between 1 and {}".format(name, renders.RENDER_MAX_PIXELS)
+            )
+    if not 0 < scale <= 4:
+        raise ValueError("scale must be between 0 and 4")
+    return {
+        "formats": list(formats),
+        "sections": sections,
+        "width": width,
+        "height": height,
+        "scale": scale,
+    }
+
+
+def run_images(params, path, progress):
+    directory = path + ".images"
+    written, failures = renders.export(
+        directory,
+        params["formats"],
+        params["sections"],
+        params["width"],
+        params["height"],
+        params["scale"],
+        progress=progress,
+    )
+    try:
+        if failures:
+            raise RuntimeError(
+                "{} of {} images failed: {}".format(
+                    len(failures), written + len(failures), failures[0][1]
+                )
+            )
+        return shutil.make_archive(path, "zip", directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+KINDS = {
+    "sweep": Kind(check_sweep, run_sweep),
+    "export": Kind(check_export, run_export),
+    "images": Kind(check_images, run_images),
+}
+
+
+def job_id(kind, params):
+    """
+    Digest of a job and the data it would read.
+    """
+    if kind == "sweep":
+        version = datasource.get(params["vintage"]).version
+    elif kind == "export":
+        # The versions of every vintage the export reads
+        version = exports.Selection(params).key()
+    else:
+        version = datasource.active().version
+    parts = [kind, params, version]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def get(id):
+    """
+    Job of an id, or None.
+    """
+    with database() as db:
+        row = db.execute(
+            "SELECT id, kind, params, status, progress, owner, result, error "
+            "FROM jobs WHERE id = ?",
+            (id,),
+        ).fetchone()
+    if row is None:
+        return None
+    job = Job(*row)
+    return job._replace(params=json.loads(job.params))
+
+
+def requeue(job):
+    """
+    Queues a job again in this process if it is still in the state read,
+    and returns it as it is now.
+    """
+    with database() as db:
+        changed = db.execute(
+            "UPDATE jobs SET status = 'queued', progress = 0, owner = ?, "
+            "result = NULL, error = NULL, updated = ? "
+            "WHERE id = ? AND status = ? AND owner IS ?",
+            (os.getpid(), time.time(), job.id, job.status, job.owner),
+        ).rowcount
+    if changed:
+        executor().submit(run, job.id)
+    return get(job.id)
+
+
+def refresh(job, retry=False):
+    """
+    A job, queued again if its process died or its file is gone, or with
+    retry if it failed.
+    """
+    if job is None:
+        return None
+    if (
+        (job.status in PENDING and not alive(job.owner))
+        or (job.status == "done" and not os.path.exists(job.result))
+        or (retry and job.status == "failed")
+    ):
+        return requeue(job)
+    return job
+
+
+def submit(kind, params):
+    """
+    Queues a job, or returns the same job already submitted. Raises
+    ValueError for an unknown kind or invalid parameters.
+    """
+    if kind not in KINDS:
+        raise ValueError("Unknown job kind: {}".format(kind))
+    params = KINDS[kind].check(params)
+    id = job_id(kind, params)
+    now = time.time()
+    with database() as db:
+        inserted = db.execute(
+            "INSERT OR IGNORE INTO jobs (id, kind, params, status, owner, created, "
+            "updated) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (id, kind, json.dumps(params), os.getpid(), now, now),
+        ).rowcount
+    if inserted:
+        executor().submit(run, id)
+        return get(id)
+    return refresh(get(id), retry=True)
+
+
+def set_progress(id, fraction):
+    with database() as db:
+        db.execute(
+            "UPDATE jobs SET progress = ?, updated = ? WHERE id = ? AND owner = ?",
+            (fraction, time.time(), id, os.getpid()),
+        )
+
+
+def run(id):
+    """
+    Runs a queued job of this process and records its result.
+    """
+    with database() as db:
+        claimed = db.execute(
+            "UPDATE jobs SET status = 'running', updated = ? "
+            "WHERE id = ? AND status = 'queued' AND owner = ?",
+            (time.time(), id, os.getpid()),
+        ).rowcount
+    if not claimed:
+        return
+    job = get(id)
+    os.makedirs(JOB_DIR, exist_ok=True)
+    try:
+        result = KINDS[job.kind].run(
+            job.params,
+            os.path.join(JOB_DIR, job.id),
+            lambda fraction: set_progress(job.id, fraction),
+        )
+    except Exception as e:
+        logger.exception("Job %s failed", job.id)
+        if isinstance(e, HTTPException):
+            e = e.description
+        status, progress, result, error = "failed", job.progress, None, str(e)
+    else:
+        status, progress, error = "done", 1.0, None
+    with database() as db:
+        db.execute(
+            "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, "
+            "updated = ? WHERE id = ? AND owner = ?",
+            (status, progress, result, error, time.time(), job.id, os.getpid()),
+        )
+    prune()
+
+
+def prune(max_bytes=JOB_DIR_MAX_BYTES):
+    """
+    Deletes failed jobs older than JOB_MAX_AGE, and the least recently used
+    finished jobs and their files beyond max_bytes, down to util.PRUNE_TO
+    of it. A file's modification time is its last use.
+    """
+    with database() as db:
+        db.execute(
+            "DELETE FROM jobs WHERE status = 'failed' AND updated < ?",
+            (time.time() - JOB_MAX_AGE,),
+        )
+        done = db.execute(
+            "SELECT id, result FROM jobs WHERE status = 'done'"
+        ).fetchall()
+    files = []
+    for id, path in done:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, id, path))
+    total = sum(size for _, size, _, _ in files)
+    if total <= max_bytes:
+        return
+    for _, size, id, path in sorted(files):
+        with database() as db:
+            db.execute("DELETE FROM jobs WHERE id = ? AND status = 'done'", (id,))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+        if total <= max_bytes * util.PRUNE_TO:
+            break
+
+
+def describe(job):
+    """
+    JSON body of a job's status.
+    """
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "url": flask.url_for("jobs.status", id=job.id),
+        "result": (
+            flask.url_for("jobs.result", id=job.id) if job.status == "done" else None
+        ),
+    }
+
+
+def status_response(job, status=200):
+    response = flask.Response(
+        json.dumps(describe(job)), status=status, mimetype="application/json"
+    )
+    response.cache_control.no_store = True
+    if job.status in PENDING:
+        response.headers["Retry-After"] = "1"
+    return response
+
+
+@blueprint.route("/<kind>", methods=["POST"])
+def create(kind):
+    """
+    Queues a job, 202 Accepted with its status.
+    """
+    params = flask.request.get_json(silent=True)
+    if params is None:
+        params = {}
+    if not isinstance(params, dict):
+        flask.abort(400, "Parameters must be a JSON object")
+    try:
+        job = submit(kind, params)
+    except ValueError as e:
+        flask.abort(400, str(e))
+    response = status_response(job, 200 if job.status == "done" else 202)
+    response.headers["Location"] = describe(job)["url"]
+    return response
+
+
+@blueprint.route("/<id>")
+def status(id):
+    """
+    Status and progress of a job.
+    """
+    job = refresh(get(id))
+    if job is None:
+        flask.abort(404, "Unknown job: " + id)
+    return status_response(job)
+
+
+@blueprint.route("/<id>/result")
+def result(id):
+    """
+    Sends the file of a finished job, or 202 while it runs.
+    """
+    job = refresh(get(id))
+    if job is None:
+        flask.abort(404, "Unknown job: " + id)
+    if job.status == "failed":
+        flask.abort(500, "Job failed: {}".format(job.error))
+    if job.status != "done":
+        return status_response(job, 202)
+    try:
+        # Marks the result as recently used, for prune()
+        os.utime(job.result)
+    except OSError:
+        flask.abort(503, "The result was removed; please retry")
+    return flask.send_file(job.result, as_attachment=True, max_age=3600)
+
+
+def init_app(app):
+    """
+    Registers the job routes on the Dash app's server.
+    """
+    app.server.register_blueprint(
+        blueprint, url_prefix=app.config.requests_pathname_prefix + "jobs"
+    )
@@ -0,0 +1,295 @@
+"""
+Callback instrumentation and a Prometheus /metrics route.
+
+init_app() wraps every server callback registered on the app after it is
+called, and times each call in three phases:
+
+    prep       the callback body outside figure building, e.g. reading inputs
+               and resolving the dataset
+    figure     figure building and figure cache lookups, timed by phase()
+    serialize  Dash encoding the callback output as JSON
+
+along with the total and the size of the JSON response. GET /metrics
+exports them as histograms in the Prometheus text format, together with
+the counters of registered collectors such as the figure cache.
+
+Calls slower than SLOW_CALLBACK_SECONDS are logged with their breakdown.
+With PROFILE_SAMPLE_RATE above 0, that fraction of calls runs under
+cProfile, and the profiles of slow ones are written to PROFILE_DIR.
+"""
+
+import cProfile
+import collections
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+
+import flask
+
+SLOW_CALLBACK_SECONDS = float(os.environ.get("SLOW_CALLBACK_SECONDS", 1))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+DURATION_BUCKETS = [
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+]
+SIZE_BUCKETS = [2**n for n in range(8, 24, 2)]
+
+PHASES = ["prep", "figure", "serialize", "total"]
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Cumulative histogram of observations for each set of label values.
+    """
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, values, amount):
+        with self.lock:
+            if values not in self.series:
+                self.series[values] = [[0] * len(self.buckets), 0, 0.0]
+            counts, _, _ = series = self.series[values]
+            for i, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    counts[i] += 1
+            series[1] += 1
+            series[2] += amount
+
+    def lines(self):
+        yield "# HELP {} {}".format(self.name, self.help)
+        yield "# TYPE {} histogram".format(self.name)
+        with self.lock:
+            series = {values: list(s) for values, s in self.series.items()}
+        for values, (counts, count, total) in sorted(series.items()):
+            labels = label_text(self.labels, values)
+            for bound, n in zip(self.buckets, counts):
+                yield '{}_bucket{{{}le="{}"}} {}'.format(
+                    self.name, labels + ",", bound, n
+                )
+            yield '{}_bucket{{{}le="+Inf"}} {}'.format(self.name, labels + ",", count)
+            yield "{}_sum{{{}}} {}".format(self.name, labels, total)
+            yield "{}_count{{{}}} {}".format(self.name, labels, count)
+
+
+class Counter:
+    """
+    Count for each set of label values.
+    """
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self.lock:
+            self.counts[values] += amount
+
+    def lines(self):
+        yield "# HELP {} {}".format(self.name, self.help)
+        yield "# TYPE {} counter".format(self.name)
+        with self.lock:
+            counts = dict(self.counts)
+        for values, count in sorted(counts.items()):
+            yield "{}{{{}}} {}".format(
+                self.name, label_text(self.labels, values), count
+            )
+
+
+def label_text(names, values):
+    return ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+DURATION = Histogram(
+    "dash_callback_duration_seconds",
+    "Callback wall time by phase.",
+    ["callback", "phase"],
+    DURATION_BUCKETS,
+)
+PAYLOAD = Histogram(
+    "dash_callback_payload_bytes",
+    "Size of the JSON callback response.",
+    ["callback"],
+    SIZE_BUCKETS,
+)
+ERRORS = Counter(
+    "dash_callback_errors_total", "Callbacks that raised an error.", ["callback"]
+)
+
+_collectors = []
+_local = threading.local()
+
+
+def collector(function):
+    """
+    Registers function(), which yields lines of metrics text for /metrics.
+    """
+    _collectors.append(function)
+    return function
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Adds the time spent in the block to a phase of the running callback.
+    Does nothing outside a callback.
+    """
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] += time.perf_counter() - start
+
+
+def timed_body(function):
+    """
+    Wraps a callback function to time its body, separately from Dash's
+    serialization of its output.
+    """
+
+    def wrapper(*args, **kwargs):
+        with phase("body"):
+            return function(*args, **kwargs)
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def timed_callback(name, dispatch):
+    """
+    Wraps the function Dash dispatches a callback to, which calls the body
+    and serializes its output.
+    """
+
+    def wrapper(*args, **kwargs):
+        _local.phases = collections.Counter()
+        profile = None
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                response = profile.runcall(dispatch, *args, **kwargs)
+            else:
+                response = dispatch(*args, **kwargs)
+        except Exception as e:
+            # Dash signals skipped updates with exceptions, not failures
+            if type(e).__name__ not in ("PreventUpdate", "CallbackException"):
+                ERRORS.inc((name,))
+            raise
+        finally:
+            phases = _local.phases
+            _local.phases = None
+        total = time.perf_counter() - start
+        record(name, phases, total, response, profile)
+        return response
+
+    return wrapper
+
+
+def record(name, phases, total, response, profile=None):
+    """
+    Records the phases and payload of a finished callback call.
+    """
+    durations = {
+        "prep": max(phases["body"] - phases["figure"], 0),
+        "figure": phases["figure"],
+        "serialize": max(total - phases["body"], 0),
+        "total": total,
+    }
+    for key in PHASES:
+        DURATION.observe((name, key), durations[key])
+    if isinstance(response, str):
+        PAYLOAD.observe((name,), len(response))
+
+    if total >= SLOW_CALLBACK_SECONDS:
+        logger.warning(
+            "Slow callback %s: %.3fs (prep %.3fs, figure %.3fs, serialize %.3fs)",
+            name,
+            total,
+            durations["prep"],
+            durations["figure"],
+            durations["serialize"],
+        )
+        if profile is not None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(
+                PROFILE_DIR,
+                "{}-{}-{}.prof".format(name, os.getpid(), time.time_ns() // 1000),
+            )
+            profile.dump_stats(path)
+            logger.warning("Profile of %s written to %s", name, path)
+
+
+def render():
+    """
+    Text of every metric in the Prometheus exposition format.
+    """
+    lines = []
+    for metric in [DURATION, PAYLOAD, ERRORS]:
+        lines.extend(metric.lines())
+    for function in _collectors:
+        lines.extend(function())
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    Instruments the callbacks registered on the app from now on and adds
+    the /metrics route.
+    """
+    register = app.callback
+
+    def callback(*args, **kwargs):
+        before = set(app.callback_map)
+        decorator = register(*args, **kwargs)
+
+        def instrument(function):
+            wrapped = decorator(timed_body(function))
+            for name in set(app.callback_map) - before:
+                entry = app.callback_map[name]
+                entry["callback"] = timed_callback(name, entry["callback"])
+            return wrapped
+
+        return instrument
+
+    app.callback = callback
+
+    @app.server.route(app.config.requests_pathname_prefix + "metrics")
+    def metrics():
+        return flask.Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,86 @@
+"""
+Precomputed rankings of the rate columns.
+
+For every measure of the data store, and for every measure under each
+alternative scenario, the sort order of the ranked jurisdictions, their
+sorted names and values, the weighted OECD average and the positions of the
+three US entries, None for an entry not in the data, are computed once when
+the index is built. Figures read these instead of sorting and averaging on
+every request.
+"""
+
+import collections
+
+import numpy as np
+
+from scenarios import SCENARIOS, ScenarioTable
+from store import US, positions
+
+Ranking = collections.namedtuple(
+    "Ranking", ["order", "names", "values", "oecd_avg", "us"]
+)
+
+
+def make_ranking(order, names, values, weights, us_rows):
+    """
+    Ranking of values sorted by order.
+    """
+    values = values[order]
+    names = names[order]
+    values.flags.writeable = False
+    names.flags.writeable = False
+    order.flags.writeable = False
+    return Ranking(
+        order=order,
+        names=names,
+        values=values,
+        oecd_avg=float(np.average(values, weights=weights[order])),
+        us=positions(order, us_rows),
+    )
+
+
+class RankIndex:
+    """
+    Rankings of every measure and scenario of one data store version.
+    """
+
+    def __init__(self, store, scenario_table=None):
+        self.version = store.version
+        self.scenario_table = scenario_table or ScenarioTable(store)
+        names = store.column("name", "ranked")
+        weights = store.column("weight", "ranked")
+        us_rows = [
+            store.position(code, "ranked") if code in store.index else None
+            for code in US
+        ]
+
+        self.rankings = {}
+        for measure in store.measures:
+            values = store.column(measure, "ranked")
+            self.rankings[measure, None] = make_ranking(
+                np.argsort(values), names, values, weights, us_rows
+            )
+            for scenario in SCENARIOS:
+                order, _ = self.scenario_table.ranked(scenario, measure)
+                values = self.scenario_table.values[
+                    SCENARIOS.index(scenario), :, self.scenario_table.column[measure]
+                ]
+                self.rankings[measure, scenario] = make_ranking(
+                    order, names, values, weights, us_rows
+                )
+
+    @property
+    def nbytes(self):
+        """
+        Size of the ranking and scenario arrays.
+        """
+        arrays = [self.scenario_table.values]
+        for ranking in self.rankings.values():
+            arrays += [ranking.order, ranking.names, ranking.values]
+        return sum(array.nbytes for array in arrays)
+
+    def get(self, measure, scenario=None):
+        """
+        Ranking of a measure, under an alternative scenario if given.
+        """
+        return self.rankings[measure, scenario]
@@ -0,0 +1,63 @@
+"""
+Figure to image rendering, run in the worker processes of renders.py.
+
+Each worker starts one headless browser through kaleido when it starts and
+reuses it for every render. Images are written straight to their cache
+path, so only the path crosses back to the server process.
+"""
+
+import logging
+import os
+
+import plotly.io as pio
+
+from util import atomic_path
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+
+def warm():
+    """
+    Starts the renderer once for the worker process. If that fails, each
+    render starts its own and reports the error itself.
+    """
+    import kaleido
+
+    try:
+        # A first render fails fast where the browser is missing, where
+        # starting the shared server would wait for it indefinitely
+        pio.to_image({"data": [], "layout": {}}, format="svg", validate=False)
+        kaleido.start_sync_server(silence_warnings=True)
+    except Exception:
+        logger.warning("Starting the renderer failed", exc_info=True)
+
+
+def write_image(figure, path, format, width=None, height=None, scale=1):
+    """
+    Renders a serialized figure and writes the image to path.
+    """
+    data = pio.to_image(
+        figure, format=format, width=width, height=height, scale=scale, validate=False
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_path(path) as temporary:
+        with open(temporary, "wb") as f:
+            f.write(data)
+    return path
+
+
+def write_state(section, inputs, path, format, width=None, height=None, scale=1):
+    """
+    Builds the figure of a dashboard state and writes its image to path.
+    """
+    # Only workers of the batch export build figures, and so load the data
+    from figures import render
+
+    figure = render(section, inputs)
+    return write_image(figure, path, format, width, height, scale)
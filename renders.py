@@ -0,0 +1,328 @@
+"""
+Static image rendering of the dashboard figures.
+
+GET /render/<section>/<inputs>.<format> returns the figure of a dashboard
+state as PNG, SVG or PDF, with the callback inputs joined by "-" as in
+snapshot file names, e.g. /render/country/metr-USA-OECD.png or, comparing
+more countries, /render/country/metr-USA-DEU-FRA-JPN.svg. Query
+parameters set the width and height in pixels, the scale and the vintage.
+
+Images are rendered by a pool of RENDER_WORKERS processes, each keeping a
+headless browser open, and cached in RENDER_DIR by figure, inputs, size and
+data version. A request for an image not in the cache gets 202 Accepted and
+Retry-After at once, so it does not hold a server worker, the render
+finishes in the background, and the next request is served from the cache;
+RENDER_WAIT sets seconds to wait for the render first. A failed render is
+reported to the next request for it. The cache holds at most RENDER_DIR_MB
+of images, dropping the least recently served first.
+
+The country comparison takes at most RENDER_MAX_COUNTRIES countries and
+peer groups, with no peer repeated.
+
+Rendering needs the optional kaleido package and a Chrome it can use.
+
+The batch export renders every state of the dashboard across all cores:
+
+    python renders.py --out images --format png --format svg
+"""
+
+import argparse
+import concurrent.futures
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import threading
+import weakref
+
+import flask
+
+import datasource
+import figure_cache
+import renderer
+import snapshot
+import util
+from figures import COUNTRY_RATES, states
+
+RENDER_DIR = os.environ.get(
+    "RENDER_DIR", os.path.join(tempfile.gettempdir(), "oecd-tax-burden-renders")
+)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+RENDER_WAIT = float(os.environ.get("RENDER_WAIT", 0))
+RENDER_WIDTH = int(os.environ.get("RENDER_WIDTH", 1000))
+RENDER_MAX_PIXELS = 4000
+RENDER_MAX_COUNTRIES = int(os.environ.get("RENDER_MAX_COUNTRIES", 10))
+RENDER_DIR_MAX_BYTES = float(os.environ.get("RENDER_DIR_MB", 512)) * 2**20
+
+_pool = None
+_pool_pid = None
+_pending = {}
+_lock = threading.Lock()
+_states = weakref.WeakKeyDictionary()
+
+
+def available():
+    """
+    Whether kaleido is installed.
+    """
+    return importlib.util.find_spec("kaleido") is not None
+
+
+def pool(workers=RENDER_WORKERS):
+    """
+    Render process pool of this process. Workers are spawned rather than
+    forked, so they do not inherit the server's threads and open sockets.
+    """
+    global _pool, _pool_pid
+    with _lock:
+        if _pool_pid != os.getpid():
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=renderer.warm,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def image_path(directory, section, inputs, format, width, height, scale):
+    """
+    Path of the image of a figure state and size inside a directory.
+    """
+    name = snapshot.filename(section, inputs)[: -len(".json")]
+    size = "{}x{}@{}".format(width or "auto", height or "auto", scale)
+    return os.path.join(directory, name + "." + size + "." + format)
+
+
+def is_state(section, inputs, dataset):
+    """
+    Whether the inputs are a reachable state of a section. The country
+    comparison also takes up to RENDER_MAX_COUNTRIES countries and peer
+    groups, the peers after the first two all different.
+    """
+    if section == "country":
+        rate, *countries = inputs
+        peers = countries[2:]
+        return (
+            rate in COUNTRY_RATES
+            and 2 <= len(countries) <= RENDER_MAX_COUNTRIES
+            and len(set(peers)) == len(peers)
+            and all(
+                code in dataset.countries or code in dataset.groups
+                for code in countries
+            )
+        )
+    if dataset not in _states:
+        _states[dataset] = set(states(dataset))
+    return (section, inputs) in _states[dataset]
+
+
+def submit(section, inputs, format, width, height, scale, dataset):
+    """
+    Future of the image of a figure state, started unless one is pending.
+    """
+    path = image_path(
+        os.path.join(RENDER_DIR, dataset.version[:16]),
+        section,
+        inputs,
+        format,
+        width,
+        height,
+        scale,
+    )
+    with _lock:
+        future = _pending.get(path)
+    if future is not None:
+        return path, future
+    figure = figure_cache.figure(section, inputs, dataset)
+    executor = pool()
+    with _lock:
+        if path not in _pending:
+            future = executor.submit(
+                renderer.write_image, figure, path, format, width, height, scale
+            )
+            _pending[path] = future
+            future.add_done_callback(lambda future: finished(path, future))
+        return path, _pending[path]
+
+
+def finished(path, future):
+    """
+    Forgets a finished render, and the pool if a worker died. A failed
+    render stays pending until a request reports it.
+    """
+    global _pool_pid
+    if future.exception() is None:
+        with _lock:
+            _pending.pop(path, None)
+        util.prune(RENDER_DIR, RENDER_DIR_MAX_BYTES)
+    elif isinstance(future.exception(), concurrent.futures.process.BrokenProcessPool):
+        _pool_pid = None
+
+
+def failed(path, future):
+    """
+    Forgets a failed render, so that the next request starts it again.
+    """
+    with _lock:
+        if _pending.get(path) is future:
+            del _pending[path]
+
+
+def size(name, default=None):
+    """
+    Pixel size query parameter.
+    """
+    value = flask.request.args.get(name)
+    if value is None:
+        return default
+    if not value.isdigit() or not 0 < int(value) <= RENDER_MAX_PIXELS:
+        flask.abort(400, "{} must be between 1 and {}".format(name, RENDER_MAX_PIXELS))
+    return int(value)
+
+
+def render_image(section, inputs, format):
+    """
+    Sends the image of a figure state, or 202 while it is being rendered.
+    """
+    if format not in renderer.FORMATS:
+        flask.abort(404)
+    vintage = flask.request.args.get("vintage")
+    if vintage and vintage not in datasource.vintages():
+        flask.abort(400, "Unknown vintage: " + vintage)
+    dataset = datasource.get(vintage or None)
+    inputs = tuple(inputs.split("-"))
+    if not is_state(section, inputs, dataset):
+        flask.abort(404)
+    if not available():
+        flask.abort(501, "Rendering images needs the kaleido package")
+    width = size("width", RENDER_WIDTH)
+    height = size("height")
+    try:
+        scale = float(flask.request.args.get("scale", 1))
+    except ValueError:
+        flask.abort(400, "scale must be a number")
+    if not 0 < scale <= 4:
+        flask.abort(400, "scale must be between 0 and 4")
+
+    path, future = submit(section, inputs, format, width, height, scale, dataset)
+    if not os.path.exists(path):
+        done, _ = concurrent.futures.wait([future], timeout=RENDER_WAIT)
+        if not done:
+            response = flask.Response("Rendering", status=202, mimetype="text/plain")
+            response.headers["Retry-After"] = "1"
+            return response
+        if future.exception() is not None:
+            failed(path, future)
+            flask.abort(500, "Rendering failed: {}".format(future.exception()))
+    try:
+        # Marks the image as recently served, for util.prune()
+        os.utime(path)
+    except OSError:
+        flask.abort(503, "The image was removed; please retry")
+    return flask.send_file(path, mimetype=renderer.FORMATS[format], max_age=3600)
+
+
+def init_app(app):
+    """
+    Registers the image route on the Dash app's server.
+    """
+    app.server.add_url_rule(
+        app.config.requests_pathname_prefix + "render/<section>/<inputs>.<format>",
+        "render_image",
+        render_image,
+    )
+
+
+def export(
+    out_dir,
+    formats,
+    sections=None,
+    width=RENDER_WIDTH,
+    height=None,
+    scale=1,
+    workers=None,
+    progress=None,
+):
+    """
+    Renders every state of the given sections in each format to out_dir.
+    Returns the number of images written and the failures. progress, if
+    given, is called with the share of the images finished.
+    """
+    tasks = [
+        (
+            section,
+            inputs,
+            image_path(out_dir, section, inputs, format, width, height, scale),
+            format,
+        )
+        for section, inputs in states()
+        if sections is None or section in sections
+        for format in formats
+    ]
+    failures = []
+    with concurrent.futures.ProcessPoolExecutor(
+        workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=renderer.warm,
+    ) as executor:
+        futures = {
+            executor.submit(
+                renderer.write_state,
+                section,
+                inputs,
+                path,
+                format,
+                width,
+                height,
+                scale,
+            ): path
+            for section, inputs, path, format in tasks
+        }
+        for i, future in enumerate(concurrent.futures.as_completed(futures)):
+            if future.exception() is not None:
+                failures.append((futures[future], future.exception()))
+            if progress is not None:
+                progress((i + 1) / len(tasks))
+    return len(tasks) - len(failures), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every dashboard figure.")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=list(renderer.FORMATS),
+        help="image format, may be repeated (default png)",
+    )
+    parser.add_argument(
+        "--section",
+        action="append",
+        choices=["bar", "country", "financing", "alternative"],
+        help="section to render, may be repeated (default all)",
+    )
+    parser.add_argument("--width", type=int, default=RENDER_WIDTH)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--workers", type=int, help="processes (default all cores)")
+    args = parser.parse_args()
+    if not available():
+        parser.error("rendering images needs the kaleido package")
+
+    written, failures = export(
+        args.out,
+        args.format or ["png"],
+        args.section,
+        args.width,
+        args.height,
+        args.scale,
+        args.workers,
+    )
+    for path, error in failures:
+        print("Failed: {}: {}".format(path, error))
+    print("Rendered {} images to {}".format(written, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Alternative US policy scenarios for section four.
+
+The OECD rows of data/output.csv are expanded once into an array indexed by
+(scenario, jurisdiction, measure) in which the three US entries carry the
+estimates of the alternative rows (USA_1..4, USA_H1..4, USA_B1..4). Ranking
+a scenario is then a gather along the current-law order and one argsort.
+
+A vintage may lack the proposal entries or the alternative rows. The table
+then covers the US entries it has, and a scenario is available only when
+each of them has its row; the others keep the current law rates.
+"""
+
+import numpy as np
+
+from store import positions
+
+SCENARIOS = ["CL", "BONUS", "RND", "EBITDA", "FDII"]
+
+# US entries and the prefix of their alternative rows, e.g. USA_H -> USA_H1
+US_ENTRIES = {"USA": "USA_", "USA_H": "USA_H", "USA_B": "USA_B"}
+
+HOVER_LABELS = {
+    "CL": "",
+    "BONUS": "100% Bonus Depreciation",
+    "RND": "100% Bonus Depreciation<br>and R&D Expensing",
+    "EBITDA": "100% Bonus Depreciation,<br>R&D Expensing,<br>and 30% EBITDA Limitation",
+    "FDII": "100% Bonus Depreciation,<br>R&D Expensing,<br>30% EBITDA Limitation,<br>and FDII",
+}
+
+
+class ScenarioTable:
+    """
+    Rates of the OECD jurisdictions under each alternative scenario.
+    """
+
+    def __init__(self, store):
+        self.measures = store.measures
+        self.column = {measure: i for i, measure in enumerate(self.measures)}
+        self.countries = store.column("country", "ranked")
+        self.names = store.column("name", "ranked")
+        self.weights = store.column("weight", "ranked")
+
+        values = np.column_stack(
+            [store.column(measure, "ranked") for measure in self.measures]
+        )
+        # US entries in the data, and their positions in the ranked partition
+        self.entries = [code for code in US_ENTRIES if code in store.index]
+        self.us = np.array(
+            [store.position(code, "ranked") for code in self.entries], dtype=np.intp
+        )
+        self.values = np.repeat(values[None], len(SCENARIOS), axis=0)
+        self.scenarios = SCENARIOS[:1]
+        for s in range(1, len(SCENARIOS)):
+            codes = [US_ENTRIES[code] + str(s) for code in self.entries]
+            if not all(code in store.index for code in codes):
+                continue
+            self.scenarios.append(SCENARIOS[s])
+            alternative = [store.row(code) for code in codes]
+            self.values[s, self.us] = [
+                [store.column(measure)[row] for measure in self.measures]
+                for row in alternative
+            ]
+
+        # Current law order of each measure
+        self.order = {
+            measure: np.argsort(self.values[0, :, j])
+            for measure, j in self.column.items()
+        }
+
+    def ranked(self, scenario, measure):
+        """
+        Row order and values of a measure under a scenario, sorted ascending.
+        """
+        base = self.order[measure]
+        values = self.values[SCENARIOS.index(scenario), base, self.column[measure]]
+        order = np.argsort(values)
+        return base[order], values[order]
+
+    def position(self, code):
+        """
+        Position of a US entry in the ranked partition.
+        """
+        if code not in self.entries:
+            raise KeyError(code)
+        return int(self.us[self.entries.index(code)])
+
+    def positions(self, order):
+        """
+        Positions of the US entries in the data in a row order.
+        """
+        return positions(order, self.us)
@@ -0,0 +1,148 @@
+"""
+Compression and HTTP caching for the Flask server behind the app.
+
+Text responses (JSON, HTML, JavaScript, CSS) are compressed with brotli when
+the client accepts it and the brotli package is installed, and with gzip
+otherwise. Compressed bodies are memoized by content, so the figures served
+from the figure cache and the cached layout are compressed once.
+
+The layout and callback dependencies get strong ETags made from the data
+version and a digest of the body, and Cache-Control: no-cache, so browsers
+and reverse proxies revalidate them and get 304 Not Modified until the data
+or the app changes. Assets are cached for ASSET_MAX_AGE seconds, and for a
+year when their URL carries Dash's modification time fingerprint.
+"""
+
+import functools
+import gzip
+import hashlib
+import os
+
+import flask
+
+import datasource
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS = os.environ.get("COMPRESS", "true").lower() in ("1", "true", "yes")
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+COMPRESS_MIN_SIZE = 500
+COMPRESS_TYPES = [
+    "application/json",
+    "application/javascript",
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "text/plain",
+    "image/svg+xml",
+]
+
+ASSET_MAX_AGE = int(os.environ.get("ASSET_MAX_AGE", 86400))
+FINGERPRINTED_MAX_AGE = 31536000
+
+# Endpoints revalidated with an ETag, relative to the requests prefix
+REVALIDATED = ["_dash-layout", "_dash-dependencies"]
+
+
+def accepted_encoding(accept_encoding):
+    """
+    Best content coding supported by both the client and the server.
+    """
+    codings = {
+        coding.split(";")[0].strip() for coding in accept_encoding.lower().split(",")
+    }
+    if brotli is not None and "br" in codings:
+        return "br"
+    if "gzip" in codings:
+        return "gzip"
+    return None
+
+
+@functools.lru_cache(maxsize=256)
+def compress(data, coding):
+    """
+    Body compressed with a content coding.
+    """
+    if coding == "br":
+        return brotli.compress(data, quality=min(COMPRESS_LEVEL, 11))
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def etag(data):
+    """
+    Strong ETag of a body served for the active data version.
+    """
+    digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+    return datasource.active().version[:16] + "-" + digest
+
+
+def is_compressible(response, asset=False):
+    """
+    Whether a response is a complete text body. Assets are files sent as
+    streams, but are small enough to read whole.
+    """
+    return (
+        response.status_code == 200
+        and (asset or not response.is_streamed)
+        and "Content-Encoding" not in response.headers
+        and response.mimetype in COMPRESS_TYPES
+    )
+
+
+def cache_control(response, path, prefix):
+    """
+    Sets Cache-Control on the layout, dependencies and assets.
+    """
+    if path in [prefix + endpoint for endpoint in REVALIDATED]:
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+    elif path.startswith(prefix + "assets/"):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        if "m" in flask.request.args:
+            response.cache_control.max_age = FINGERPRINTED_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = ASSET_MAX_AGE
+
+
+def init_app(app):
+    """
+    Registers the compression and caching layer on the Dash app's server.
+    """
+    prefix = app.config.requests_pathname_prefix
+
+    @app.server.after_request
+    def serve(response):
+        request = flask.request
+        if request.method not in ("GET", "HEAD", "POST"):
+            return response
+        cache_control(response, request.path, prefix)
+        if not is_compressible(response, request.path.startswith(prefix + "assets/")):
+            return response
+
+        response.direct_passthrough = False
+        data = response.get_data()
+        coding = None
+        if COMPRESS and len(data) >= COMPRESS_MIN_SIZE:
+            coding = accepted_encoding(request.headers.get("Accept-Encoding", ""))
+        response.vary.add("Accept-Encoding")
+
+        if request.path in [prefix + endpoint for endpoint in REVALIDATED]:
+            # Each coding of a body is a different representation
+            response.set_etag(etag(data) + ("-" + coding if coding else ""))
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        if coding:
+            response.set_data(compress(data, coding))
+            response.headers["Content-Encoding"] = coding
+            tag, weak = response.get_etag()
+            if tag and not weak and request.path.startswith(prefix + "assets/"):
+                # The file's ETag no longer names these exact bytes
+                response.set_etag(tag, weak=True)
+        return response
@@ -0,0 +1,135 @@
+"""
+Static snapshot export of every dashboard state.
+
+Renders each reachable figure of the four sections to a pre-serialized JSON
+file and writes a manifest describing them, with the data version and the
+digest of the code that built them. A server started with SNAPSHOT_DIR
+pointing at the export answers callbacks from these files instead of
+building figures, if it runs the same data and code, and the files can also
+be served by a CDN.
+
+Usage:
+
+    python snapshot.py --out snapshots
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+
+import plotly.io as pio
+
+import datasource
+from figures import APP_PATH, code_version, states, render
+
+MANIFEST = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+
+def filename(section, inputs):
+    """
+    Relative path of a figure inside a snapshot directory.
+    """
+    return section + "/" + "-".join(inputs) + ".json"
+
+
+def export(out_dir, dataset=None):
+    """
+    Writes every figure state and the manifest to out_dir.
+    """
+    dataset = dataset or datasource.active()
+    figures = {}
+    for section, inputs in states(dataset):
+        name = filename(section, inputs)
+        path = os.path.join(out_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(pio.to_json(render(section, inputs, dataset), validate=False))
+        figures.setdefault(section, {})["|".join(inputs)] = name
+
+    manifest = {
+        "data": dataset.version,
+        "code": code_version(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "figures": figures,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+class Snapshot:
+    """
+    Read access to an exported snapshot directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+
+    def path(self, section, inputs):
+        """
+        Absolute path of a figure file, or None if it was not exported.
+        """
+        name = self.manifest["figures"].get(section, {}).get("|".join(map(str, inputs)))
+        if name is None:
+            return None
+        return os.path.join(self.directory, name)
+
+    def read(self, section, inputs):
+        """
+        Raw JSON bytes of a figure, or None if it was not exported.
+        """
+        path = self.path(section, inputs)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def figure(self, section, inputs):
+        """
+        Parsed figure, or None if it was not exported.
+        """
+        raw = self.read(section, inputs)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+
+def load(directory):
+    """
+    Opens a snapshot directory, returning None if it is missing or stale.
+    """
+    if not directory or not os.path.exists(os.path.join(directory, MANIFEST)):
+        return None
+    snapshot = Snapshot(directory)
+    if snapshot.manifest["data"] != datasource.active().version:
+        logger.warning("Ignoring snapshot %s built from other data.", directory)
+        return None
+    if snapshot.manifest.get("code") != code_version():
+        logger.warning("Ignoring snapshot %s built by other code.", directory)
+        return None
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export every dashboard state to static JSON."
+    )
+    parser.add_argument(
+        "--out",
+        default=os.path.join(APP_PATH, "snapshots"),
+        help="directory to write the snapshot to",
+    )
+    args = parser.parse_args()
+    manifest = export(args.out)
+    count = sum(len(figures) for figures in manifest["figures"].values())
+    print("Wrote {} figures to {}".format(count, args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Position of the US among the OECD members on each rate.
+
+RankSolver sorts the rates of the OECD members other than the US once per
+data store, so the rank of any value, the members above it and the value
+needed to reach a rank are binary searches. Ranks count from the highest
+rate, 1 for the highest, with ties in favor of the value ranked.
+
+The break-even statutory rate of a rank is the US current law statutory
+rate at which a measure falls below the bound of that rank. Measures other
+than the statutory rate are projected with the policy calculator: its
+change from current law is added to the US estimate of the data, over a
+grid of statutory rates precomputed once and searched the same way. The
+batch sweep projects and ranks its policies likewise.
+"""
+
+import collections
+
+import numpy as np
+
+import calculator
+from scenarios import SCENARIOS
+from store import US
+
+# Statutory rates over which break-even rates are searched
+STATUTORY_RATES = np.round(np.linspace(0, 0.6, 6001), 4)
+
+BreakEven = collections.namedtuple("BreakEven", ["rate", "status"])
+BreakEven.__doc__ = """
+Break-even statutory rate of a rank, None unless status is "found". The
+status is "every_rate" when the US ranks at the rank or lower at every
+rate from 0 to 60 percent, as it always does at rank 1, "no_rate" when it
+does at none, and "not_increasing" when the measure does not rise with the
+statutory rate.
+"""
+
+
+class RankSolver:
+    """
+    Sorted rates of the OECD members other than the US, on every measure of
+    one data store.
+    """
+
+    def __init__(self, store, ranks):
+        others = ~np.isin(store.column("country", "members"), US)
+        names = store.column("name", "members")[others]
+        self.values = {}
+        self.names = {}
+        for measure in store.measures:
+            values = store.column(measure, "members")[others]
+            order = np.argsort(values, kind="stable")
+            self.values[measure] = values[order]
+            self.names[measure] = names[order]
+        self.averages = {
+            measure: ranks.get(measure).oecd_avg for measure in store.measures
+        }
+        self.scenario_table = ranks.scenario_table
+        self.count = int(others.sum())
+        self._curves = {}
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.values.values())
+
+    def us(self, measure, code="USA", scenario="CL"):
+        """
+        Rate of a US entry under a scenario. KeyError if the data lacks
+        the entry or the scenario.
+        """
+        table = self.scenario_table
+        if scenario not in table.scenarios:
+            raise KeyError(scenario)
+        return float(
+            table.values[
+                SCENARIOS.index(scenario), table.position(code), table.column[measure]
+            ]
+        )
+
+    def rank(self, measure, value):
+        """
+        Rank of a value among the members, 1 if none is higher.
+        """
+        values = self.values[measure]
+        return len(values) - int(np.searchsorted(values, value, side="right")) + 1
+
+    def ranks(self, measure, values):
+        """
+        Rank of each of an array of values, as rank() gives it, 0 for NaN.
+        """
+        sorted_values = self.values[measure]
+        ranks = len(sorted_values) - np.searchsorted(sorted_values, values, "right") + 1
+        return np.where(np.isnan(values), 0, ranks)
+
+    def above(self, measure, value):
+        """
+        Names and rates of the members higher than a value, lowest first.
+        """
+        i = np.searchsorted(self.values[measure], value, side="right")
+        return list(
+            zip(self.names[measure][i:].tolist(), self.values[measure][i:].tolist())
+        )
+
+    def gap(self, measure, value):
+        """
+        Difference of a value from the weighted OECD average.
+        """
+        return value - self.averages[measure]
+
+    def bound(self, measure, rank):
+        """
+        Rate below which a value ranks at rank or lower, None for rank 1.
+        """
+        values = self.values[measure]
+        if not 1 <= rank <= len(values) + 1:
+            raise ValueError("rank must be from 1 to {}".format(len(values) + 1))
+        if rank == 1:
+            return None
+        return float(values[len(values) - rank + 1])
+
+    def project(self, measure, rates):
+        """
+        US estimates of a measure under policies of which rates are the
+        calculated rates: their change from the calculated current law
+        added to the US current law estimate of the data.
+        """
+        change = rates - calculator.calculate(calculator.CURRENT_LAW)[measure]
+        # Rounded so that the float error of the difference cannot move a
+        # rate across a bound the data states to a few decimals
+        return np.round(self.us(measure) + change, 10)
+
+    def curve(self, measure):
+        """
+        The US current law estimate of a measure at each of STATUTORY_RATES,
+        if it rises with the statutory rate, else None.
+        """
+        if measure not in self._curves:
+            law = calculator.CURRENT_LAW
+            rates = calculator.rates(STATUTORY_RATES, *law[1:])[measure]
+            curve = self.project(measure, rates)
+            increasing = bool(np.all(np.diff(curve) >= 0))
+            self._curves[measure] = curve if increasing else None
+        return self._curves[measure]
+
+    def break_even(self, measure, rank):
+        """
+        BreakEven of the highest US statutory rate, other policy at current
+        law, at which the US ranks at rank or lower on a measure.
+        """
+        bound = self.bound(measure, rank)
+        if bound is None:
+            return BreakEven(None, "every_rate")
+        curve = self.curve(measure)
+        if curve is None:
+            return BreakEven(None, "not_increasing")
+        i = int(np.searchsorted(curve, bound, side="left"))
+        if i == 0:
+            return BreakEven(None, "no_rate")
+        if i == len(curve):
+            return BreakEven(None, "every_rate")
+        return BreakEven(float(STATUTORY_RATES[i - 1]), "found")
@@ -0,0 +1,234 @@
+"""
+Columnar in-memory store of the effective tax rate estimates.
+
+data/output.csv is parsed once into one contiguous NumPy array per column,
+with a country code to row index and named partitions of the rows:
+
+    members       OECD member countries, including the US under current law
+    proposals     the US under the House and Biden proposals
+    oecd          the OECD aggregate row
+    alternatives  the US entries under alternative policies (USA_1, USA_H1, ...)
+    ranked        members and proposals, the jurisdictions ranked in figures
+    comparable    ranked and the OECD aggregate, the countries in section two
+
+Partitions that are contiguous in the file are slices, so reading a column
+of a partition returns a view rather than a copy.
+
+compile_data() converts a CSV file to a directory of .npy column arrays,
+which DataStore memory-maps instead of parsing the CSV.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+DATA_FILE = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)), "data", "output.csv"
+)
+
+TEXT_COLUMNS = ["country", "name"]
+
+COMPILED_SUFFIX = ".columns"
+COMPILED_META = "meta.json"
+
+US = ["USA", "USA_H", "USA_B"]
+PROPOSALS = ["USA_H", "USA_B"]
+OECD = "OECD"
+ALTERNATIVE_PATTERN = re.compile(r"^USA_[HB]?\d+$")
+
+
+def positions(order, rows):
+    """
+    Positions of the given row numbers within a permutation of the rows,
+    None for a row that is None.
+    """
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return [None if row is None else int(inverse[row]) for row in rows]
+
+
+def partition(rows):
+    """
+    Slice over a list of row numbers when contiguous, otherwise an index array.
+    """
+    if len(rows) and rows == list(range(rows[0], rows[-1] + 1)):
+        return slice(rows[0], rows[-1] + 1)
+    return np.array(rows, dtype=np.intp)
+
+
+def read_csv(path):
+    """
+    Version and column arrays of a CSV data file.
+    """
+    # pandas is only needed to parse CSV and build frames, so it is not
+    # imported at all when the data is loaded from its compiled form
+    import pandas as pd
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    frame = pd.read_csv(io.BytesIO(raw))
+    columns = {}
+    for name in frame.columns:
+        dtype = str if name in TEXT_COLUMNS else np.float64
+        columns[name] = np.ascontiguousarray(frame[name].to_numpy(dtype=dtype))
+    return hashlib.sha256(raw).hexdigest(), columns
+
+
+def compiled_path(path):
+    """
+    Directory holding the compiled form of a CSV data file.
+    """
+    return os.path.splitext(path)[0] + COMPILED_SUFFIX
+
+
+def compile_data(path, out=None):
+    """
+    Writes each column of a CSV data file as a .npy array next to a
+    metadata file recording the version and the source it was built from.
+    """
+    out = out or compiled_path(path)
+    version, columns = read_csv(path)
+    os.makedirs(out, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(out, name + ".npy"), values, allow_pickle=False)
+    stat = os.stat(path)
+    meta = {
+        "version": version,
+        "source": os.path.abspath(path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "columns": list(columns),
+        "rows": len(columns["country"]),
+    }
+    with open(os.path.join(out, COMPILED_META), "w") as f:
+        json.dump(meta, f, indent=1)
+    return out
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, COMPILED_META)) as f:
+        return json.load(f)
+
+
+def is_current(directory, source):
+    """
+    Whether a compiled directory exists and was built from the source as it is now.
+    """
+    if not os.path.exists(os.path.join(directory, COMPILED_META)):
+        return False
+    meta = read_meta(directory)
+    stat = os.stat(source)
+    return (meta["source_size"], meta["source_mtime_ns"]) == (
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+
+
+def read_compiled(directory):
+    """
+    Version and memory-mapped column arrays of a compiled data directory.
+    """
+    meta = read_meta(directory)
+    columns = {
+        name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+        for name in meta["columns"]
+    }
+    return meta["version"], columns
+
+
+class DataStore:
+    """
+    Column arrays, row index and partitions of one data file.
+
+    The file is read from its compiled form when that is up to date, so the
+    columns are memory-mapped and shared through the page cache by every
+    worker, and parsed from CSV otherwise. path may also name a compiled
+    directory directly.
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        if os.path.isdir(path):
+            self.compiled = path
+        elif is_current(compiled_path(path), path):
+            self.compiled = compiled_path(path)
+        else:
+            self.compiled = None
+        if self.compiled:
+            self.version, self.columns = read_compiled(self.compiled)
+        else:
+            self.version, self.columns = read_csv(path)
+
+        self.column_names = list(self.columns)
+        self.measures = [
+            name for name in self.column_names if name not in TEXT_COLUMNS + ["weight"]
+        ]
+        codes = self.columns["country"].tolist()
+        self.index = {code: i for i, code in enumerate(codes)}
+
+        rows = {"members": [], "proposals": [], "oecd": [], "alternatives": []}
+        for i, code in enumerate(codes):
+            if code == OECD:
+                rows["oecd"].append(i)
+            elif code in PROPOSALS:
+                rows["proposals"].append(i)
+            elif ALTERNATIVE_PATTERN.match(code):
+                rows["alternatives"].append(i)
+            else:
+                rows["members"].append(i)
+        rows["ranked"] = sorted(rows["members"] + rows["proposals"])
+        rows["comparable"] = sorted(rows["ranked"] + rows["oecd"])
+        self.partitions = {name: partition(r) for name, r in rows.items()}
+
+    def __len__(self):
+        return len(self.columns["country"])
+
+    @property
+    def nbytes(self):
+        """
+        Size of the column arrays.
+        """
+        return sum(values.nbytes for values in self.columns.values())
+
+    def column(self, name, part=None):
+        """
+        Column array, optionally restricted to a partition.
+        """
+        values = self.columns[name]
+        if part is None:
+            return values
+        return values[self.partitions[part]]
+
+    def row(self, code):
+        """
+        Row number of a country code.
+        """
+        return self.index[code]
+
+    def position(self, code, part):
+        """
+        Position of a country code within a partition.
+        """
+        rows = self.partitions[part]
+        row = self.index[code]
+        if isinstance(rows, slice):
+            if not rows.start <= row < rows.stop:
+                raise KeyError(code)
+            return row - rows.start
+        positions = np.flatnonzero(rows == row)
+        if not len(positions):
+            raise KeyError(code)
+        return int(positions[0])
+
+    def frame(self, part=None, columns=None):
+        """
+        DataFrame copy of a partition, for export.
+        """
+        import pandas as pd
+
+        columns = columns or self.column_names
+        return pd.DataFrame({name: self.column(name, part) for name in columns})
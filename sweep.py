@@ -0,0 +1,280 @@
+"""
+Batch sweep of the policy calculator over a grid of parameters.
+
+Every combination of the given values of the calculator's policy parameters
+is evaluated, with the resulting US rates and the rank of the US among the
+OECD members of the data on each rate. As the rank solver does, each rate
+is the calculator's change from current law added to the US estimate of the
+data, and ranks count from the highest rate, 1 for the highest, 0 where the
+rate is undefined. Parameters without values stay at current law. For
+example, statutory rates from 21 to 35 percent by steps of 0.5 points, bonus
+depreciation from 0 to 100 percent by steps of 5 points and R&D expensing on
+or off:
+
+    python sweep.py --out sweep.parquet --statutory-rate 0.21:0.35:0.005 \\
+        --bonus 0:1:0.05 --rnd-expensing 0,1
+
+The grid is never built in memory. It is split into chunks of SWEEP_CHUNK_SIZE
+points, which a pool of processes evaluates from their flat indices, and the
+results are written to Parquet, one row group per chunk, in grid order as
+chunks finish. At most two chunks per process are in flight, so memory stays
+bounded whatever the size of the grid.
+
+Parquet needs the optional pyarrow package; a path ending in .csv writes CSV
+instead.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+import calculator
+import datasource
+from util import atomic_path, has_pyarrow
+
+SWEEP_CHUNK_SIZE = int(os.environ.get("SWEEP_CHUNK_SIZE", 100000))
+
+DEFAULT_MEASURES = ["metr_overall", "aetr_overall"]
+
+# Rank solver of the dataset, set in each worker
+_solver = None
+
+
+def grid_range(text):
+    """
+    Start, step and number of values of a start:stop:step range, checked
+    to be finite with a positive step, stop not below start and a finite
+    number of values.
+    """
+    start, stop, step = (float(value) for value in text.split(":"))
+    if not all(math.isfinite(value) for value in (start, stop, step)):
+        raise ValueError("range bounds and step must be finite")
+    if step <= 0:
+        raise ValueError("step must be positive")
+    if stop < start:
+        raise ValueError("stop must not be below start")
+    steps = (stop - start) / step
+    if not math.isfinite(steps):
+        raise ValueError("step is too small for the range")
+    count = int(round(steps)) + 1
+    return start, step, count
+
+
+def grid_count(text):
+    """
+    Number of values of a range or list, without building them.
+    """
+    if ":" in text:
+        return grid_range(text)[2]
+    return len(grid_values(text))
+
+
+def grid_values(text):
+    """
+    Values of a parameter from a start:stop:step range, which includes stop,
+    or a comma separated list.
+    """
+    if ":" in text:
+        start, step, count = grid_range(text)
+        return np.round(start + step * np.arange(count), 10)
+    values = np.array([float(value) for value in text.split(",")])
+    if not np.all(np.isfinite(values)):
+        raise ValueError("values must be finite")
+    return values
+
+
+class Grid:
+    """
+    Cartesian product of values of each policy parameter, in row-major order
+    of calculator.Policy's fields.
+    """
+
+    def __init__(self, values=None):
+        values = values or {}
+        unknown = set(values) - set(calculator.Policy._fields)
+        if unknown:
+            raise ValueError(
+                "unknown parameters: {}".format(", ".join(sorted(unknown)))
+            )
+        self.values = [
+            np.asarray(values.get(name, [getattr(calculator.CURRENT_LAW, name)]), float)
+            for name in calculator.Policy._fields
+        ]
+        self.shape = tuple(len(v) for v in self.values)
+        if 0 in self.shape:
+            raise ValueError("every parameter needs at least one value")
+
+    def __len__(self):
+        return math.prod(self.shape)
+
+    def points(self, start, stop):
+        """
+        Parameter arrays of the points from flat index start to stop.
+        """
+        indexes = np.unravel_index(np.arange(start, stop), self.shape)
+        return [values[index] for values, index in zip(self.values, indexes)]
+
+    def chunks(self, size=SWEEP_CHUNK_SIZE):
+        """
+        (start, stop) flat index bounds of the chunks of the grid.
+        """
+        for start in range(0, len(self), size):
+            yield start, min(start + size, len(self))
+
+
+def init_worker(solver):
+    global _solver
+    _solver = solver
+
+
+def evaluate(grid, start, stop, measures):
+    """
+    Columns of the points of a grid chunk: the parameters, the rates of the
+    measures and the US rank on each.
+    """
+    points = grid.points(start, stop)
+    rates = calculator.rates(*points)
+    columns = collections.OrderedDict(zip(calculator.Policy._fields, points))
+    for measure in measures:
+        columns[measure] = _solver.project(measure, rates[measure])
+    for measure in measures:
+        ranks = _solver.ranks(measure, columns[measure])
+        columns["rank_" + measure] = ranks.astype(np.int32)
+    return columns
+
+
+def results(grid, measures, workers=None, dataset=None):
+    """
+    Yields the columns of each chunk of the grid in order, evaluated by a
+    pool of processes with at most two chunks per process in flight.
+    """
+    workers = workers or os.cpu_count()
+    solver = (dataset or datasource.active()).solver
+    with concurrent.futures.ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(solver,),
+    ) as executor:
+        pending = collections.deque()
+        for start, stop in grid.chunks():
+            pending.append(executor.submit(evaluate, grid, start, stop, measures))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_parquet(chunks, path):
+    """
+    Writes chunks of columns to Parquet, one row group per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for columns in chunks:
+            table = pa.Table.from_pydict(dict(columns))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_csv(chunks, path):
+    """
+    Writes chunks of columns to CSV.
+    """
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        for i, columns in enumerate(chunks):
+            if i == 0:
+                out.writerow(columns)
+            out.writerows(zip(*(values.tolist() for values in columns.values())))
+
+
+def reporting(chunks, total, progress):
+    """
+    Passes chunks through, calling progress with the share of the points
+    done after each.
+    """
+    done = 0
+    for columns in chunks:
+        yield columns
+        done += len(next(iter(columns.values())))
+        progress(done / total)
+
+
+def sweep(
+    grid,
+    path,
+    measures=DEFAULT_MEASURES,
+    workers=None,
+    dataset=None,
+    progress=None,
+):
+    """
+    Evaluates every point of a grid and writes the results to path, as CSV
+    if it ends in .csv and Parquet otherwise. Returns the number of points.
+    progress, if given, is called with the share of the points written.
+    """
+    chunks = results(grid, measures, workers, dataset)
+    if progress is not None:
+        chunks = reporting(chunks, len(grid), progress)
+    # Written under a temporary name, so an interrupted sweep leaves no file
+    with atomic_path(path) as temporary:
+        if path.endswith(".csv"):
+            write_csv(chunks, temporary)
+        else:
+            write_parquet(chunks, temporary)
+    return len(grid)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate the policy calculator over a grid of parameters."
+    )
+    parser.add_argument("--out", required=True, help="output .parquet or .csv file")
+    for name in calculator.Policy._fields:
+        parser.add_argument(
+            "--" + name.replace("_", "-"),
+            type=grid_values,
+            metavar="START:STOP:STEP|V1,V2,...",
+            help="values of the {} (default current law)".format(
+                calculator.SLIDERS[name][0].lower()
+            ),
+        )
+    parser.add_argument(
+        "--measure",
+        action="append",
+        choices=calculator.MEASURES,
+        help="rate to compute and rank, may be repeated "
+        "(default metr_overall and aetr_overall)",
+    )
+    parser.add_argument("--workers", type=int, help="processes (default all cores)")
+    args = parser.parse_args()
+
+    if not args.out.endswith(".csv") and not has_pyarrow():
+        parser.error("writing Parquet needs the pyarrow package; use a .csv path")
+    grid = Grid(
+        {
+            name: getattr(args, name)
+            for name in calculator.Policy._fields
+            if getattr(args, name) is not None
+        }
+    )
+    count = sweep(grid, args.out, args.measure or DEFAULT_MEASURES, args.workers)
+    print("Evaluated {} policies to {}".format(count, args.out))
+
+
+if __name__ == "__main__":
+    main()
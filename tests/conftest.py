@@ -0,0 +1,32 @@
+"""
+Shared setup of the tests. Run them from the repository root:
+
+    python -m pytest tests
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Files of the tests are kept apart from those of a server on this machine
+SCRATCH = tempfile.mkdtemp(prefix="oecd-tax-burden-tests-")
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+for name in ["EXPORT_DIR", "JOB_DIR", "RENDER_DIR"]:
+    os.environ[name] = os.path.join(SCRATCH, name.lower())
+os.environ["FIGURE_STORE"] = ""
+for name in ["DATA_DIR", "SNAPSHOT_DIR", "JOB_DB"]:
+    os.environ.pop(name, None)
+
+
+@pytest.fixture(scope="session")
+def client():
+    import app
+
+    return app.server.test_client()
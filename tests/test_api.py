@@ -0,0 +1,54 @@
+"""
+Tests of the JSON API under /api/v1.
+"""
+
+import pytest
+
+import datasource
+
+
+def test_api_index(client):
+    body = client.get("/api/v1/").get_json()
+    assert body["scenario"] == ["CL", "BONUS", "RND", "EBITDA", "FDII"]
+    assert body["vintage"] == datasource.vintages()
+    assert "USA_H" in body["country"]
+
+
+def test_api_rates_filter(client):
+    response = client.get(
+        "/api/v1/rates?country=USA&measure=metr&asset=overall&financing=overall"
+    )
+    assert response.status_code == 200
+    (record,) = response.get_json()["data"]
+    store = datasource.active().store
+    value = float(store.column("metr_overall")[store.row("USA")])
+    assert record["column"] == "metr_overall"
+    assert record["value"] == value
+    assert record["rank"] == 1 + sum(
+        rate < value for rate in store.column("metr_overall", "ranked")
+    )
+
+
+def test_api_rates_pages(client):
+    first = client.get("/api/v1/rates?limit=5").get_json()
+    second = client.get("/api/v1/rates?limit=5&offset=5").get_json()
+    assert len(first["data"]) == 5
+    assert first["meta"]["total"] == second["meta"]["total"] > 10
+    assert first["data"][-1] != second["data"][0]
+
+
+def test_api_rates_conditional(client):
+    response = client.get("/api/v1/rates?country=DEU")
+    etag = response.headers["ETag"]
+    again = client.get("/api/v1/rates?country=DEU", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["rates?scenario=NONE", "rates?fields=nope", "rates?limit=-1", "rates?vintage=0"],
+)
+def test_api_rejects_bad_queries(client, query):
+    response = client.get("/api/v1/" + query)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
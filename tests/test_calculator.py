@@ -0,0 +1,72 @@
+"""
+Tests of the cost of capital calculator.
+"""
+
+import numpy as np
+import pytest
+
+import calculator
+import datasource
+from calculator import CURRENT_LAW, MEASURES, calculate, rates
+from figures import make_calculator_figure
+
+
+def test_no_tax():
+    result = calculate(CURRENT_LAW._replace(statutory_rate=0.0, fdii_rate=0.0))
+    for measure in MEASURES:
+        assert result[measure] == pytest.approx(0, abs=1e-12), measure
+
+
+def test_expensing_without_interest_deduction():
+    # Deducting the whole investment at once, with no other deduction, leaves
+    # the cost of capital of machines at the real rate
+    policy = CURRENT_LAW._replace(bonus=1.0, interest_deductible=0.0)
+    assert calculate(policy)["metr_machines"] == pytest.approx(0, abs=1e-12)
+    assert calculate(policy)["aetr_machines"] > 0
+
+
+def test_policies_move_rates():
+    current = calculate(CURRENT_LAW)
+    assert current["statutory_tax_rate"] == CURRENT_LAW.statutory_rate
+    bonus = calculate(CURRENT_LAW._replace(bonus=1.0))
+    assert bonus["metr_machines"] < current["metr_machines"]
+    assert bonus["metr_overall"] < current["metr_overall"]
+    assert bonus["metr_land"] == current["metr_land"]
+    fdii = calculate(CURRENT_LAW._replace(fdii_rate=0.1))
+    assert fdii["metr_ip"] < current["metr_ip"]
+    # The FDII rate never raises the rate on IP above the statutory rate
+    assert calculate(CURRENT_LAW._replace(fdii_rate=0.5)) == calculate(
+        CURRENT_LAW._replace(fdii_rate=CURRENT_LAW.statutory_rate)
+    )
+
+
+def test_rates_broadcast():
+    bonus = np.linspace(0, 1, 5)
+    result = rates(*CURRENT_LAW._replace(bonus=bonus))
+    for i, value in enumerate(bonus):
+        single = calculate(CURRENT_LAW._replace(bonus=float(value)))
+        for measure in MEASURES:
+            assert result[measure].shape == bonus.shape
+            assert result[measure][i] == pytest.approx(single[measure], nan_ok=True)
+
+
+def test_metr_undefined_near_zero_cost():
+    metr = calculator.metr(np.array([-0.05, 0.0, calculator.MIN_COST / 2, 0.1]))
+    assert np.isnan(metr[:3]).all()
+    assert metr[3] == pytest.approx(0.5)
+
+
+def test_figure_projects_on_the_data():
+    dataset = datasource.active()
+    store = dataset.store
+    figure = make_calculator_figure(CURRENT_LAW, "metr", "METR", "METR")
+    current = next(t for t in figure["data"] if t["name"] == "US Current Law")
+    # As the rank solver and the sweep, the figure shows the data's US rates
+    # at current law
+    assert current["x"][0] == pytest.approx(
+        float(store.column("metr_overall")[store.row("USA")])
+    )
+    policy = CURRENT_LAW._replace(bonus=1.0)
+    scenario = make_calculator_figure(policy, "metr", "METR", "METR")["data"][2]
+    change = calculate(policy)["metr_overall"] - calculate(CURRENT_LAW)["metr_overall"]
+    assert scenario["x"][0] == pytest.approx(current["x"][0] + change)
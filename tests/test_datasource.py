@@ -0,0 +1,80 @@
+"""
+Tests of the vintages and hot reloading of the data source.
+"""
+
+import os
+import shutil
+
+import pytest
+
+import datasource
+from store import DATA_FILE
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """
+    A DATA_DIR holding copies of the data as vintages 2019 and 2021,
+    restoring the default data afterwards.
+    """
+    for vintage in ["2019", "2021"]:
+        shutil.copy2(DATA_FILE, tmp_path / (vintage + ".csv"))
+    datasource.DATA_DIR = str(tmp_path)
+    yield tmp_path
+    datasource.DATA_DIR = None
+    datasource.reload()
+
+
+def change(path):
+    """
+    Raises every statutory rate of a data file by one point.
+    """
+    with open(path) as f:
+        header, *lines = f.read().splitlines()
+    column = header.split(",").index("statutory_tax_rate")
+    rows = []
+    for line in lines:
+        values = line.split(",")
+        values[column] = str(float(values[column]) + 0.01)
+        rows.append(",".join(values))
+    with open(path, "w") as f:
+        f.write("\n".join([header] + rows) + "\n")
+
+
+def test_reload_swaps_changed_default(data_dir):
+    # The same content under another path is not reloaded
+    assert not datasource.reload()
+    previous = datasource.active()
+    version = previous.version
+    rate = float(previous.store.column("statutory_tax_rate")[0])
+    prepared = []
+    datasource.on_load(prepared.append)
+    try:
+        change(data_dir / "2021.csv")
+        assert datasource.reload()
+    finally:
+        datasource._hooks.remove(prepared.append)
+    dataset = datasource.active()
+    assert prepared == [dataset]
+    assert dataset.vintage == "2021"
+    assert dataset.version != version
+    assert float(dataset.store.column("statutory_tax_rate")[0]) == pytest.approx(
+        rate + 0.01
+    )
+    # A request holding the previous dataset keeps a consistent version
+    assert previous.version == version
+    assert float(previous.store.column("statutory_tax_rate")[0]) == rate
+    assert not datasource.reload()
+
+
+def test_reload_drops_changed_vintage(data_dir):
+    datasource.reload()
+    dataset = datasource.get("2019")
+    assert datasource.get("2019") is dataset
+    assert "2019" in datasource.loaded()
+    change(data_dir / "2019.csv")
+    datasource.reload()
+    assert "2019" not in datasource.loaded()
+    assert datasource.get("2019").version != dataset.version
+    os.remove(data_dir / "2019.csv")
+    assert datasource.vintages() == ["2021"]
@@ -0,0 +1,60 @@
+"""
+Tests of the /download export route.
+"""
+
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import datasource
+import exports
+from store import DATA_FILE
+
+
+def test_download_matches_old_csv(client):
+    # What the CSV button sent before the download route
+    expected = pd.read_csv(DATA_FILE)[0:39].to_csv().encode()
+    streamed = client.get("/download")
+    assert streamed.status_code == 200
+    assert streamed.get_data() == expected
+    # The second request is sent from the file written by the first
+    assert client.get("/download").get_data() == expected
+
+
+def test_download_parquet(client):
+    pytest.importorskip("pyarrow")
+    response = client.get("/download?format=parquet&measures=metr_overall")
+    frame = pd.read_parquet(io.BytesIO(response.get_data()))
+    store = datasource.active().store
+    assert (
+        frame["metr_overall"].tolist()
+        == store.column("metr_overall", "ranked").tolist()
+    )
+
+
+@pytest.mark.parametrize(
+    "query", ["format=xml", "sections=nope", "measures=nope", "scenarios=NONE"]
+)
+def test_download_rejects_bad_queries(client, query):
+    assert client.get("/download?" + query).status_code == 400
+
+
+def test_download_order_independent(client):
+    first = client.get("/download?measures=aetr_overall,metr_overall")
+    data = first.get_data()
+    second = client.get("/download?measures=metr_overall,aetr_overall")
+    assert second.get_data() == data
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_download_cache_bounded(client, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_DIR_MAX_BYTES", 2**14)
+    for measure in datasource.active().store.measures[:10]:
+        client.get("/download?format=json&measures=" + measure).get_data()
+    sizes = [
+        os.path.getsize(os.path.join(exports.EXPORT_DIR, name))
+        for name in os.listdir(exports.EXPORT_DIR)
+    ]
+    assert sum(sizes) <= 2**14
@@ -0,0 +1,74 @@
+"""
+Tests of the figure store shared by the server processes.
+"""
+
+import types
+
+import datasource
+import figure_store
+
+
+def figure(size):
+    return {"data": [{"type": "bar", "y": [0.5] * size}], "layout": {}}
+
+
+def total(store):
+    (size,) = store.execute("SELECT SUM(size) FROM figures").fetchone()
+    return size or 0
+
+
+def test_round_trip(tmp_path):
+    store = figure_store.FigureStore(str(tmp_path / "figures.sqlite"))
+    assert store.get("bar", ("metr",), "v1") is None
+    store.put("bar", ("metr",), "v1", figure(3))
+    assert store.get("bar", ("metr",), "v1") == figure(3)
+    assert store.get("bar", ("metr",), "v2") is None
+    # A figure stored again replaces the previous one
+    store.put("bar", ("metr",), "v1", figure(5))
+    assert store.get("bar", ("metr",), "v1") == figure(5)
+    info = store.info()
+    assert (info["hits"], info["misses"], info["entries"]) == (2, 2, 1)
+    assert info["bytes"] == total(store)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "figures.sqlite")
+    store = figure_store.FigureStore(path)
+    store.put("bar", ("a",), "v1", figure(100))
+    size = store.info()["bytes"]
+    store = figure_store.FigureStore(path, max_bytes=2.5 * size)
+    store.put("bar", ("b",), "v1", figure(100))
+    store.get("bar", ("a",), "v1")
+    store.put("bar", ("c",), "v1", figure(100))
+    assert store.get("bar", ("b",), "v1") is None
+    assert store.get("bar", ("a",), "v1") is not None
+    assert [inputs for inputs, _ in store.recent("bar", "v1")] == [("c",), ("a",)]
+    assert store.info()["bytes"] == total(store) <= 2.5 * size
+
+
+def test_invalidate_and_prune(tmp_path):
+    path = str(tmp_path / "figures.sqlite")
+    store = figure_store.FigureStore(path)
+    store.put("bar", ("a",), "v1", figure(1))
+    store.put("bar", ("a",), "v2", figure(1))
+    store.invalidate("v1")
+    assert store.get("bar", ("a",), "v1") is None
+    assert store.get("bar", ("a",), "v2") is not None
+    # Figures of other code are never served and are pruned at startup
+    store.execute("UPDATE figures SET code = 'old'")
+    assert store.get("bar", ("a",), "v2") is None
+    store = figure_store.load(path)
+    assert store.info()["entries"] == 0
+    assert store.info()["bytes"] == total(store) == 0
+
+
+def test_new_data_invalidates(tmp_path, monkeypatch):
+    store = figure_store.FigureStore(str(tmp_path / "figures.sqlite"))
+    monkeypatch.setattr(figure_store, "STORE", store)
+    active = datasource.active()
+    store.put("bar", ("a",), active.version, figure(1))
+    # Reloading the same data keeps its figures
+    figure_store.invalidate(types.SimpleNamespace(version=active.version))
+    assert store.get("bar", ("a",), active.version) is not None
+    figure_store.invalidate(types.SimpleNamespace(version="new"))
+    assert store.get("bar", ("a",), active.version) is None
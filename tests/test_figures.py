@@ -0,0 +1,54 @@
+"""
+Tests of the figures against the baseline app.
+
+tests/data/baseline_figures.json holds the figures of sections one to four
+as the callbacks of the original single-file app.py returned them, for a
+sample of inputs, without their template.
+"""
+
+import base64
+import json
+import os
+
+import numpy as np
+import plotly.io as pio
+
+from figures import render
+
+BASELINE_FIGURES = os.path.join(
+    os.path.dirname(__file__), "data", "baseline_figures.json"
+)
+
+
+def normalize(value):
+    """
+    A figure as JSON with typed arrays decoded, floats rounded and the
+    template left out.
+    """
+    if isinstance(value, dict):
+        if set(value) == {"dtype", "bdata"}:
+            array = np.frombuffer(base64.b64decode(value["bdata"]), value["dtype"])
+            return normalize(array.astype(float).tolist())
+        return {k: normalize(v) for k, v in value.items() if k != "template"}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 9)
+    return value
+
+
+def test_figures_match_baseline():
+    with open(BASELINE_FIGURES) as f:
+        baseline = json.load(f)
+    for case in baseline:
+        figure = render(case["section"], tuple(case["inputs"]))
+        assert normalize(json.loads(pio.to_json(figure, validate=False))) == (
+            normalize(case["figure"])
+        ), (case["section"], case["inputs"])
+
+
+def test_figures_do_not_share_the_template():
+    first = render("bar", ("stat_tab",))
+    first["layout"]["template"]["layout"]["font"] = {"size": 99}
+    second = render("financing", ("metr",))
+    assert second["layout"]["template"]["layout"].get("font") != {"size": 99}
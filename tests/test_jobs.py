@@ -0,0 +1,126 @@
+"""
+Tests of the background job routes under /jobs.
+"""
+
+import io
+import math
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import datasource
+import jobs
+import renders
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"values": {"bonus": "0:1:0"}},
+        {"values": {"bonus": "1:0:0.1"}},
+        {"values": {"bonus": "0:1:nan"}},
+        {"values": {"bonus": ["nan"]}},
+        {"values": {"bonus": []}},
+        {"values": {"bonus": "0:1:1e-9"}},
+        {"values": {"bonus": "0:1:1e-320"}},
+        {"values": {"bonus": "0:1e300:1e-300"}},
+        {"values": {"tariff": "0,1"}},
+        {"values": "0:1:0.1"},
+        {"measures": ["nope"]},
+        {"format": "xlsx"},
+        {"vintage": "0"},
+    ],
+)
+def test_jobs_reject_bad_sweeps(client, params):
+    response = client.post("/jobs/sweep", json=params)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_jobs_unknown(client):
+    assert client.post("/jobs/nope", json={}).status_code == 400
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.get("/jobs/nope/result").status_code == 404
+
+
+def wait(client, status):
+    """
+    Final status of a job.
+    """
+    deadline = time.time() + 120
+    while status["status"] not in ("done", "failed") and time.time() < deadline:
+        time.sleep(0.2)
+        status = client.get(status["url"]).get_json()
+    return status
+
+
+def test_jobs_sweep(client):
+    params = {"values": {"statutory_rate": "0.258:0.258:0.01"}, "format": "csv"}
+    response = client.post("/jobs/sweep", json=params)
+    assert response.status_code in (200, 202)
+    status = response.get_json()
+    # The range is stored as given rather than expanded
+    assert status["params"]["values"] == {"statutory_rate": "0.258:0.258:0.01"}
+    status = wait(client, status)
+    assert status["status"] == "done", status["error"]
+    rows = pd.read_csv(io.BytesIO(client.get(status["result"]).data))
+    # At current law the sweep reproduces the data's US rate and rank
+    rank = client.get("/api/v1/rank?column=metr_overall&country=USA").get_json()
+    assert math.isclose(rows["metr_overall"][0], rank["value"])
+    assert rows["rank_metr_overall"][0] == rank["rank"]
+
+
+def test_jobs_pruned(client):
+    ids = []
+    for rate in ["0.2", "0.3"]:
+        params = {"values": {"statutory_rate": rate}, "format": "csv"}
+        status = wait(client, client.post("/jobs/sweep", json=params).get_json())
+        assert status["status"] == "done", status["error"]
+        ids.append(status["id"])
+    size = max(os.path.getsize(jobs.get(id).result) for id in ids)
+    # The first result is used again, so the second is the least recent
+    time.sleep(0.01)
+    client.get("/jobs/{}/result".format(ids[0])).get_data()
+    jobs.prune(max_bytes=1.5 * size)
+    assert jobs.get(ids[1]) is None
+    assert os.path.exists(jobs.get(ids[0]).result)
+
+
+def test_failed_jobs_pruned(client):
+    with jobs.database() as db:
+        db.execute(
+            "INSERT INTO jobs (id, kind, params, status, created, updated) "
+            "VALUES ('old', 'sweep', '{}', 'failed', 0, 0)"
+        )
+    jobs.prune()
+    assert client.get("/jobs/old").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"width": -1},
+        {"width": 0},
+        {"width": 100000},
+        {"height": -5},
+        {"scale": 0},
+        {"scale": -1},
+        {"scale": 100},
+        {"scale": "nan"},
+    ],
+)
+def test_jobs_reject_bad_image_sizes(client, monkeypatch, params):
+    monkeypatch.setattr(renders, "available", lambda: True)
+    response = client.post("/jobs/images", json=params)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_export_jobs_keyed_by_files(monkeypatch):
+    params = jobs.check_export({"vintages": "all"})
+    before = jobs.job_id("export", params)
+    # Another file of a vintage, even one other than the default
+    monkeypatch.setattr(datasource, "signature", lambda path: (path, 0, 0))
+    assert jobs.job_id("export", params) != before
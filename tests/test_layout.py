@@ -0,0 +1,19 @@
+"""
+Tests of the page layout.
+"""
+
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize("clientside", [False, True])
+def test_vintage_selectors(monkeypatch, clientside):
+    monkeypatch.setattr(app, "CLIENTSIDE_CALLBACKS", clientside)
+    vintages = ["2019", "2021"]
+    assert app.vintage_dropdown("x", ["2021"]).style == {"display": "none"}
+    # The sections drawn in the browser only show the default vintage
+    drawn = app.vintage_dropdown("x", vintages, clientside=True)
+    assert (drawn.style == {"display": "none"}) == clientside
+    served = app.vintage_dropdown("x", vintages)
+    assert served.style != {"display": "none"}
@@ -0,0 +1,45 @@
+"""
+Tests of the compression and HTTP caching of the Dash endpoints.
+"""
+
+import gzip
+import json
+
+
+def test_layout_compressed(client):
+    plain = client.get("/_dash-layout")
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+
+
+def test_layout_revalidated(client):
+    response = client.get("/_dash-layout")
+    assert response.headers["Cache-Control"] == "public, no-cache"
+    etag = response.headers["ETag"]
+    again = client.get("/_dash-layout", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert not again.data
+    # Each coding is a different representation with its own ETag
+    compressed = client.get(
+        "/_dash-layout",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert compressed.status_code == 200
+    assert compressed.headers["ETag"] != etag
+
+
+def test_assets_cached(client):
+    response = client.get("/assets/styles.css")
+    assert "max-age" in response.headers["Cache-Control"]
+    fingerprinted = client.get("/assets/styles.css?m=1")
+    assert "immutable" in fingerprinted.headers["Cache-Control"]
+
+
+def test_index_without_layout(client):
+    # The layout is loaded from /_dash-layout, not embedded in the page
+    response = client.get("/")
+    assert b"validation_layout" not in response.data
+    assert len(response.data) < 8000
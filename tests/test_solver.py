@@ -0,0 +1,54 @@
+"""
+Tests of the rank and break-even routes of the rank solver.
+"""
+
+import pytest
+
+import datasource
+from store import US
+
+
+def members_above(column, value):
+    """
+    Rates of the OECD members other than the US higher than a value.
+    """
+    store = datasource.active().store
+    countries = store.column("country", "members")
+    rates = store.column(column, "members")
+    return [
+        rate for code, rate in zip(countries, rates) if code not in US and rate > value
+    ]
+
+
+def test_api_rank_country(client):
+    body = client.get("/api/v1/rank?column=aetr_overall&country=USA_B").get_json()
+    above = members_above("aetr_overall", body["value"])
+    assert body["rank"] == len(above) + 1
+    assert sorted(rate["value"] for rate in body["above"]) == sorted(above)
+
+
+def test_api_rank_value(client):
+    body = client.get("/api/v1/rank?column=metr_overall&value=0.2").get_json()
+    assert body["rank"] == len(members_above("metr_overall", 0.2)) + 1
+    assert body["gap"] == pytest.approx(0.2 - body["average"])
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "x"])
+def test_api_rank_rejects_non_finite_values(client, value):
+    response = client.get("/api/v1/rank?column=metr_overall&value=" + value)
+    assert response.status_code == 400
+
+
+def test_api_break_even(client):
+    found = client.get("/api/v1/break-even?column=statutory_tax_rate&rank=2")
+    body = found.get_json()
+    assert body["status"] == "found"
+    assert body["statutory_tax_rate"] < body["bound"]
+    top = client.get("/api/v1/break-even?column=metr_overall&rank=1").get_json()
+    assert top["status"] == "every_rate"
+    assert top["statutory_tax_rate"] is None
+    count = client.get("/api/v1/rank?column=metr_overall&value=0").get_json()["count"]
+    last = "/api/v1/break-even?column=metr_overall&rank={}".format(count)
+    assert client.get(last).get_json()["status"] == "no_rate"
+    over = "/api/v1/break-even?column=metr_overall&rank={}".format(count + 1)
+    assert client.get(over).status_code == 400
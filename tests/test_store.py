@@ -0,0 +1,56 @@
+"""
+Tests of loading the data store from its compiled, memory-mapped form.
+"""
+
+import os
+import shutil
+
+import numpy as np
+
+from store import DATA_FILE, DataStore, compile_data, compiled_path
+
+
+def copy_data(tmp_path):
+    path = str(tmp_path / "output.csv")
+    shutil.copy2(DATA_FILE, path)
+    return path
+
+
+def test_compiled_matches_csv(tmp_path):
+    path = copy_data(tmp_path)
+    parsed = DataStore(path)
+    assert parsed.compiled is None
+    assert compile_data(path) == compiled_path(path)
+    loaded = DataStore(path)
+    assert loaded.compiled == compiled_path(path)
+    assert loaded.version == parsed.version
+    assert loaded.column_names == parsed.column_names
+    for name in parsed.column_names:
+        column = loaded.column(name)
+        assert isinstance(column, np.memmap)
+        assert column.tolist() == parsed.column(name).tolist()
+    for part in parsed.partitions:
+        assert loaded.column("country", part).tolist() == (
+            parsed.column("country", part).tolist()
+        )
+
+
+def test_compiled_directory(tmp_path):
+    path = copy_data(tmp_path)
+    directory = compile_data(path, str(tmp_path / "compiled"))
+    os.remove(path)
+    store = DataStore(directory)
+    assert store.compiled == directory
+    assert len(store) == len(DataStore(DATA_FILE))
+
+
+def test_stale_compiled_ignored(tmp_path):
+    path = copy_data(tmp_path)
+    compile_data(path)
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:-1])
+    store = DataStore(path)
+    assert store.compiled is None
+    assert len(store) == len(lines) - 2
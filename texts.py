@@ -0,0 +1,232 @@
+"""
+Text shown alongside the dashboard figures.
+
+The figures quoted in the text are not written by hand: ANALYSIS_TEXT and
+ALTERNATIVE_TEXT are templates, filled in from the data by the rank solver
+of each dataset and cached with it. The analysis of a tab is given the
+position of the US under the House and Biden proposals on the tab's rate
+as {house.*} and {biden.*}:
+
+    value        the rate in percent, e.g. 32.3
+    rank         e.g. second-highest
+    below        the members with higher rates, e.g. " (only lower than
+                 Colombia)", or nothing for the highest
+    below_rates  the same with their rates, e.g. ", only lower than Japan
+                 (23.0 percent) and Colombia (23.9 percent)"
+    gap, side    the distance from the weighted OECD average in percentage
+                 points, and above or below
+
+The text of an alternative policy is given the reduction of the rate from
+the previous policy in percentage points, as {us}, {house} and {biden} for
+the current law, House and Biden entries.
+
+When a vintage lacks the proposal entries or an alternative policy, the
+text they would fill in is replaced by MISSING_TEXT.
+"""
+
+import collections
+import threading
+import weakref
+
+import datasource
+from figures import ALTERNATIVE_TABS, BAR_TABS
+from scenarios import SCENARIOS
+
+ANALYSIS_TEXT = {
+    "stat_tab": """
+        If the US federal corporate income tax rate is increased to 28 percent, as proposed in Biden’s proposal, the United States would have the {biden.rank} combined statutory corporate tax rate in the OECD at {biden.value} percent{biden.below}. The House Ways and Means proposal, which would raise the federal tax rate to 26.5 percent, would increase the United States’ combined statutory corporate tax rate to {house.value} percent, which would be the {house.rank} in the OECD{house.below}. 
+        """,
+    "metr_tab": """
+        The proposals to raise the corporate tax burden in the United States would increase the tax burden on new corporate investment in the United States to one of the highest in the OECD. Under the Biden proposal, the METR would be {biden.value} percent, which would be the {biden.rank} in the OECD{biden.below}. The House Ways and Means proposal would increase the METR to {house.value} percent, the {house.rank} in the OECD{house.below_rates}.
+        """,
+    "aetr_tab": """
+        The Biden Administration proposal would raise the AETR to {biden.value} percent. This would be the {biden.rank} among all OECD nations{biden.below} and {biden.gap} percentage points {biden.side} the OECD average. The House Ways and Means proposal would raise the US AETR to {house.value} percent. This would result in the {house.rank} AETR among OECD nations{house.below}.
+        """,
+}
+
+ALTERNATIVE_TEXT = {
+    ("CL", "metr_tab"): """
+            Under current law, the tax treatment of certain capital expenses, research and development, interest expense, and intellectual property are scheduled to change over the next few years. These changes contribute to the United States' relatively high effective tax rate on new investment.  
+            """,
+    ("BONUS", "metr_tab"): """
+            Maintaining 100 percent bonus depreciation would have a large impact on the METR on new investment in the United States. 100 percent bonus depreciation would reduce the METR on investment by {us} percentage points under current law, {house} percentage points under the House Ways and Means proposal, and {biden} percentage points under Biden’s proposal. 
+            """,
+    ("RND", "metr_tab"): """
+            Maintaining expensing of research and development costs would reduce the METR on new investment in the United States. However, the impact would be slightly smaller than that of bonus depreciation ({us} percentage points under current law, {house} under the House Ways and Means proposal, and {biden} under Biden's proposal).
+            """,
+    ("EBITDA", "metr_tab"): """
+            Canceling the switch from 30 percent of EBITDA to 30 percent of earnings before interest and taxes (EBIT) for the net interest deduction would reduce the METR on new investment by roughly the same extent as maintaining expensing for research and development costs.
+            """,
+    ("FDII", "metr_tab"): """
+            Maintaining current policy FDII would have a negligible impact on the marginal tax rate on new investment. If research and development is already expensed, the METR on new investment is already zero. Reducing the rate has no impact on the incentive to invest in research and development. 
+            """,
+    ("CL", "aetr_tab"): """
+            Under current law, the tax treatment of certain capital expenses, research and development, interest expense, and intellectual property are scheduled to change over the next few years. These changes contribute to the United States' relatively high effective tax rate on new investment.  
+            """,
+    ("BONUS", "aetr_tab"): """
+            Maintaining 100 percent bonus depreciation would have a smaller impact on the AETR on new investment compared to its impact on the METR. 100 percent bonus depreciation would reduce the AETR on investment by {us} percentage points under current law, {house} percentage points under the House Ways and Means proposal, and {biden} percentage points under Biden’s proposal. 
+            """,
+    ("RND", "aetr_tab"): """
+            Maintaining expensing of research and development costs would have a smaller impact on the AETR on new investment compared to its impact on the METR. The policy would reduce the AETR on investment by {us} percentage points under current law, {house} percentage points under the House Ways and Means proposal, and {biden} percentage points under Biden’s proposal.
+            """,
+    ("EBITDA", "aetr_tab"): """
+            Canceling the switch from 30 percent of EBITDA to 30 percent of earnings before interest and taxes (EBIT) for the net interest deduction would have a smaller impact on the AETR on new investment compared to its impact on the METR. It would reduce the AETR on new investment by roughly the same extent as maintaining expensing for research and development costs.
+            """,
+    ("FDII", "aetr_tab"): """
+            Maintaining current policy FDII would reduce the AETR more than it would reduce the METR on new investment because the FDII deduction reduces the effective statutory tax rate on IP income. The policy would reduce the AETR on investment by {us} percentage points under current law, {house} percentage points under the House Ways and Means proposal, and {biden} percentage points under the Biden proposal.
+            """,
+}
+
+# Shown instead of a text whose entries are not in the data
+MISSING_TEXT = {
+    "analysis": """
+        The estimates of this data vintage do not include the House and Biden proposals.
+        """,
+    "alternative": """
+        The estimates of this data vintage do not include this alternative policy.
+        """,
+}
+
+ORDINALS = [
+    "",
+    "",
+    "second-",
+    "third-",
+    "fourth-",
+    "fifth-",
+    "sixth-",
+    "seventh-",
+    "eighth-",
+    "ninth-",
+    "tenth-",
+]
+
+# Higher members named in the text, beyond which they are counted
+NAMED_ABOVE = 3
+
+Position = collections.namedtuple(
+    "Position", ["value", "rank", "below", "below_rates", "gap", "side"]
+)
+
+_texts = weakref.WeakKeyDictionary()
+_texts_lock = threading.Lock()
+
+
+def percent(value):
+    return "{:.1f}".format(value * 100)
+
+
+def ordinal(rank):
+    """
+    Position from the top in words, e.g. second-highest.
+    """
+    if rank < len(ORDINALS):
+        return ORDINALS[rank] + "highest"
+    suffix = (
+        "th"
+        if 10 <= rank % 100 < 20
+        else {1: "st", 2: "nd", 3: "rd"}.get(rank % 10, "th")
+    )
+    return "{}{}-highest".format(rank, suffix)
+
+
+def listing(items):
+    if len(items) == 1:
+        return items[0]
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def position(solver, measure, code):
+    """
+    Fields of the position of a US entry on a measure.
+    """
+    value = solver.us(measure, code)
+    above = solver.above(measure, value)
+    gap = solver.gap(measure, value)
+    if not above:
+        below = below_rates = ""
+    elif len(above) > NAMED_ABOVE:
+        below = " (lower than {} other members)".format(len(above))
+        below_rates = ", lower than {} other members".format(len(above))
+    else:
+        below = " (only lower than {})".format(
+            listing([name for name, _ in reversed(above)])
+        )
+        below_rates = ", only lower than {}".format(
+            listing(
+                ["{} ({} percent)".format(name, percent(rate)) for name, rate in above]
+            )
+        )
+    return Position(
+        value=percent(value),
+        rank=ordinal(solver.rank(measure, value)),
+        below=below,
+        below_rates=below_rates,
+        gap=percent(abs(gap)),
+        side="above" if gap >= 0 else "below",
+    )
+
+
+def reductions(solver, measure, scenario):
+    """
+    Reduction of a measure from the previous scenario for each US entry, in
+    percentage points.
+    """
+    previous = SCENARIOS[SCENARIOS.index(scenario) - 1]
+    return {
+        key: percent(
+            solver.us(measure, code, previous) - solver.us(measure, code, scenario)
+        )
+        for key, code in [("us", "USA"), ("house", "USA_H"), ("biden", "USA_B")]
+    }
+
+
+def texts(dataset=None):
+    """
+    Analysis and alternative policy texts filled in from a dataset.
+    """
+    dataset = dataset or datasource.active()
+    with _texts_lock:
+        if dataset in _texts:
+            return _texts[dataset]
+    solver = dataset.solver
+    analysis = {}
+    for tab, template in ANALYSIS_TEXT.items():
+        measure = BAR_TABS[tab][0]
+        try:
+            analysis[tab] = template.format(
+                house=position(solver, measure, "USA_H"),
+                biden=position(solver, measure, "USA_B"),
+            )
+        except KeyError:
+            analysis[tab] = MISSING_TEXT["analysis"]
+    alternative = {}
+    for (scenario, tab), template in ALTERNATIVE_TEXT.items():
+        if scenario == "CL":
+            alternative[scenario, tab] = template
+            continue
+        measure = ALTERNATIVE_TABS[tab][0]
+        try:
+            alternative[scenario, tab] = template.format(
+                **reductions(solver, measure, scenario)
+            )
+        except KeyError:
+            alternative[scenario, tab] = MISSING_TEXT["alternative"]
+    result = {"analysis": analysis, "alternative": alternative}
+    with _texts_lock:
+        _texts[dataset] = result
+    return result
+
+
+def analysis_text(tab, dataset=None):
+    """
+    Text of section one for a tab value.
+    """
+    return texts(dataset)["analysis"][tab]
+
+
+def alternative_text(alternative, tab, dataset=None):
+    """
+    Text of section four for a policy and tab value.
+    """
+    return texts(dataset)["alternative"][alternative, tab]
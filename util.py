@@ -0,0 +1,85 @@
+"""
+Helpers shared by the JSON routes, the exports, the file writers and the
+file caches.
+"""
+
+import contextlib
+import importlib.util
+import json
+import os
+import threading
+
+import flask
+
+# Share of the size bound kept by pruning, so that it runs rarely
+PRUNE_TO = 0.9
+
+
+def split(value):
+    """
+    Items of a comma separated query parameter.
+    """
+    return [item for item in (value or "").split(",") if item]
+
+
+def json_error(exception):
+    """
+    JSON response of an HTTP error, the error handler of the JSON routes.
+    """
+    response = flask.Response(
+        json.dumps({"error": exception.description}), mimetype="application/json"
+    )
+    response.status_code = exception.code
+    return response
+
+
+def has_pyarrow():
+    """
+    Whether the optional pyarrow package, needed for Parquet, is installed.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+@contextlib.contextmanager
+def atomic_path(path):
+    """
+    Temporary path, unique per process and thread, to write a file at. It
+    is moved to path when the block completes and deleted otherwise, so
+    path never holds a partly written file.
+    """
+    temporary = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        yield temporary
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def prune(directory, max_bytes):
+    """
+    Deletes the least recently used files of a directory beyond max_bytes,
+    down to PRUNE_TO of it. A file's modification time is its last use, so
+    readers mark the files they serve with os.utime.
+    """
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return
+    for _, size, path in sorted(files):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes * PRUNE_TO:
+            break